@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from bisect import bisect_left
+from decouple import config as env
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import time
+
+from .models import UserChat
+
+
+class MembershipCache:
+    """chat_id -> the ids of its members, loaded from userchats on first use.
+
+    Chats with up to `compact_above` members are held as frozensets; larger
+    ones as a sorted tuple searched with bisect, which costs one pointer per
+    member instead of a hash table slot. The cache is bounded by the total
+    number of member ids it holds and evicts the least recently used chats.
+    Entries also expire after `ttl` seconds, which bounds how long another
+    worker's membership change can go unnoticed here.
+    """
+
+    def __init__(self, max_members: int = 100000, compact_above: int = 256, ttl: float = 60.0):
+        self.max_members = max_members
+        self.compact_above = compact_above
+        self.ttl = ttl
+        self._data: OrderedDict[int, tuple[float, frozenset|tuple]] = OrderedDict()
+        self._size = 0
+        # bumped on every invalidation so a load that raced one is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def is_member(self, db: AsyncSession, chat_id: int, user_id: str) -> bool:
+        members = self._get(chat_id)
+        if members is None:
+            self.misses += 1
+            members = await self._load(db, chat_id)
+        else:
+            self.hits += 1
+
+        if isinstance(members, tuple):
+            i = bisect_left(members, user_id)
+            return i < len(members) and members[i] == user_id
+        return user_id in members
+
+    def invalidate(self, chat_id: int):
+        self._generation += 1
+        self._drop(chat_id)
+
+    def clear(self):
+        self._generation += 1
+        self._data.clear()
+        self._size = 0
+
+    def metrics(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "chats": len(self._data), "members": self._size}
+
+    def _get(self, chat_id: int) -> frozenset|tuple|None:
+        entry = self._data.get(chat_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._drop(chat_id)
+            return None
+
+        self._data.move_to_end(chat_id)
+        return entry[1]
+
+    async def _load(self, db: AsyncSession, chat_id: int) -> frozenset|tuple:
+        generation = self._generation
+        user_ids = (await db.scalars(select(UserChat.user_id).where(UserChat.chat_id == chat_id))).all()
+        members = frozenset(user_ids) if len(user_ids) <= self.compact_above else tuple(sorted(set(user_ids)))
+
+        if generation == self._generation and len(members) <= self.max_members:
+            self._drop(chat_id)
+            self._data[chat_id] = (time.monotonic() + self.ttl, members)
+            self._size += len(members)
+            while self._size > self.max_members:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._size -= len(evicted)
+        return members
+
+    def _drop(self, chat_id: int):
+        entry = self._data.pop(chat_id, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+
+membership_cache = MembershipCache(
+    max_members=env("MEMBERSHIP_CACHE_MAX_MEMBERS", default=100000, cast=int),
+    compact_above=env("MEMBERSHIP_CACHE_COMPACT_ABOVE", default=256, cast=int),
+    ttl=env("MEMBERSHIP_CACHE_TTL", default=60, cast=float),
+)
@@ -1,7 +1,6 @@
 from sqlalchemy.orm import relationship
-from sqlalchemy import Column, ForeignKey,SmallInteger , Integer, String, DateTime
+from sqlalchemy import Column, ForeignKey, Index, SmallInteger, Integer, String, DateTime
 from datetime import datetime
-import uuid
 
 from config.db import Base
 
@@ -13,6 +12,11 @@ class Chat(Base):
     name = Column(String, nullable=False)
     status = Column(SmallInteger, nullable=False)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_message_id = Column(Integer, nullable=True)
+    last_message_at = Column(DateTime, nullable=True, index=True)
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    retention_days = Column(Integer, nullable=True)
+    archived_until = Column(DateTime, nullable=True)
 
     users = relationship("User", secondary="userchats", back_populates="chats")
     messages = relationship("Message", back_populates="chat")
@@ -20,7 +24,15 @@ class Chat(Base):
 
 class UserChat(Base):
     __tablename__ = "userchats"
+    __table_args__ = (
+        Index("ix_userchats_user_id_chat_id", "user_id", "chat_id"),
+        Index("uq_userchats_chat_id_user_id", "chat_id", "user_id", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     chat_id = Column(Integer, ForeignKey('chats.id'))
-    user_id = Column(String(36), ForeignKey('users.id'), default=str(uuid.uuid4()))
\ No newline at end of file
+    user_id = Column(String(36), ForeignKey('users.id'))
+    last_read_message_id = Column(Integer, nullable=True)
+    last_delivered_message_id = Column(Integer, nullable=True)
+    # messages of the chat at or below last_read_message_id; unread = chats.message_count - read_count
+    read_count = Column(Integer, nullable=False, default=0, server_default="0")
\ No newline at end of file
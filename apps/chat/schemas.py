@@ -9,6 +9,7 @@ class ChatBase(BaseModel):
 class ChatCreate(ChatBase):
     status: int
     users: list[str]
+    retention_days: int|None = None
     
 
 class ChatOut(ChatBase):
@@ -17,4 +18,13 @@ class ChatOut(ChatBase):
     users: list[UserRead]
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class ReadState(BaseModel):
+    chat_id: int
+    last_read_message_id: int|None = None
+    last_delivered_message_id: int|None = None
+
+    class Config:
+        from_attributes = True
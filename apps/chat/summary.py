@@ -0,0 +1,113 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, tuple_, update
+from bisect import bisect_right
+from datetime import datetime
+
+from apps.message import archive
+from apps.message.models import Message
+from .models import Chat, UserChat
+
+
+async def record_messages(session: AsyncSession, messages: list[Message]):
+    """Fold freshly inserted messages into their chats' denormalized summary.
+
+    Runs in the caller's transaction, so the summary commits (or rolls back)
+    together with the messages themselves. Each sender has obviously read
+    everything up to their own latest message, so their watermarks move with
+    it; only the batch's messages after it are still unread for them.
+    """
+    ids: dict[int, list[int]] = {}
+    latest: dict[int, Message] = {}
+    latest_by_sender: dict[tuple[int, str], Message] = {}
+    for message in messages:
+        ids.setdefault(message.chat_id, []).append(message.id)
+        if message.chat_id not in latest or message.id > latest[message.chat_id].id:
+            latest[message.chat_id] = message
+        sender_key = (message.chat_id, message.sender_id)
+        if sender_key not in latest_by_sender or message.id > latest_by_sender[sender_key].id:
+            latest_by_sender[sender_key] = message
+
+    for chat_id, message in latest.items():
+        await session.execute(
+            update(Chat)
+            .where(Chat.id == chat_id)
+            .values(
+                last_message_id=message.id,
+                last_message_at=message.time_delivered,
+                message_count=Chat.message_count + len(ids[chat_id]),
+            )
+        )
+
+    for chat_id in ids:
+        ids[chat_id].sort()
+    for (chat_id, sender_id), message in latest_by_sender.items():
+        unread = len(ids[chat_id]) - bisect_right(ids[chat_id], message.id)
+        await session.execute(
+            update(UserChat)
+            .where(UserChat.chat_id == chat_id, UserChat.user_id == sender_id)
+            .values(
+                last_read_message_id=message.id,
+                last_delivered_message_id=message.id,
+                read_count=select(Chat.message_count - unread).where(Chat.id == chat_id).scalar_subquery(),
+            )
+        )
+
+
+async def message_time(session: AsyncSession, chat_id: int, message_id: int) -> datetime|None:
+    """When message `message_id` of the chat was delivered, hot or archived; None if the chat has no such message."""
+    delivered_at = await session.scalar(
+        select(Message.time_delivered).where(Message.id == message_id, Message.chat_id == chat_id)
+    )
+    if delivered_at is None:
+        delivered_at = await archive.archived_time(message_id, chat_id)
+    return delivered_at
+
+
+async def mark_read(session: AsyncSession, chat_id: int, user_id: str, message_id: int, delivered_at: datetime) -> UserChat|None:
+    """Advance the user's read watermark in the chat to `message_id` (never backwards).
+
+    `message_id` must be a message of this chat delivered at `delivered_at`
+    (see message_time). One row is updated however many messages it covers.
+    read_count is the chat's message_count minus the messages still above
+    the watermark, which costs nothing when everything is read and otherwise
+    only walks the remaining unread messages on the (chat_id, time_delivered,
+    id) index, and its archive counterpart when the watermark is archived.
+    """
+    membership = await _membership(session, chat_id, user_id)
+    if membership is None:
+        return None
+    if membership.last_read_message_id is not None and membership.last_read_message_id >= message_id:
+        return membership
+
+    chat = await session.get(Chat, chat_id)
+    if message_id == chat.last_message_id:
+        membership.last_read_message_id = message_id
+        membership.read_count = chat.message_count
+    else:
+        key = (delivered_at, message_id)
+        still_unread = await session.scalar(
+            select(func.count())
+            .select_from(Message)
+            .where(Message.chat_id == chat_id, tuple_(Message.time_delivered, Message.id) > tuple_(*key))
+        )
+        if chat.archived_until is not None and delivered_at <= chat.archived_until:
+            still_unread += await archive.archived_count_after(chat_id, key)
+        membership.last_read_message_id = message_id
+        membership.read_count = chat.message_count - still_unread
+
+    if membership.last_delivered_message_id is None or membership.last_delivered_message_id < membership.last_read_message_id:
+        membership.last_delivered_message_id = membership.last_read_message_id
+    return membership
+
+
+async def mark_delivered(session: AsyncSession, chat_id: int, user_id: str, message_id: int) -> UserChat|None:
+    """Advance the user's delivered watermark in the chat to `message_id` (never backwards)."""
+    membership = await _membership(session, chat_id, user_id)
+    if membership is not None and (membership.last_delivered_message_id or 0) < message_id:
+        membership.last_delivered_message_id = message_id
+    return membership
+
+
+async def _membership(session: AsyncSession, chat_id: int, user_id: str) -> UserChat|None:
+    result = await session.execute(select(UserChat).where(UserChat.chat_id == chat_id, UserChat.user_id == user_id).limit(1))
+    return result.scalar_one_or_none()
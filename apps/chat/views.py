@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import selectinload
-from sqlalchemy import select
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from typing import Annotated
+from pydantic import TypeAdapter
 
 from apps.user.auth import User, get_current_user
-from repositories import ChatRepository, get_chat_repository
-from .schemas import ChatOut, ChatCreate
-from .models import Chat, UserChat
+from repositories import ChatRepository, get_chat_repository, get_chat_read_repository
+from cache import response_cache
+from .schemas import ChatOut, ChatCreate, ReadState
 
 chat_router = APIRouter()
 
+chats_adapter = TypeAdapter(list[ChatOut])
+
 @chat_router.post("/create_chat", description="вводить UUID юзера можно полyчить из /auth/users/")
 async def create_chat(
     chat_data: ChatCreate, 
@@ -17,72 +19,83 @@ async def create_chat(
     chat = await chat_repository.create_chat(chat_data)
     return chat
 
+@chat_router.post("/add_members/{chat_id}")
+async def add_members(
+    chat_id: int,
+    user_ids: Annotated[list[str], Body(min_length=1, max_length=10000)],
+    current_user: User = Depends(get_current_user),
+    chat_repository: ChatRepository = Depends(get_chat_repository),
+):
+    added = await chat_repository.add_members(chat_id, user_ids, current_user.id)
+    return {"added": added}
+
+@chat_router.post("/remove_members/{chat_id}")
+async def remove_members(
+    chat_id: int,
+    user_ids: Annotated[list[str], Body(min_length=1, max_length=10000)],
+    current_user: User = Depends(get_current_user),
+    chat_repository: ChatRepository = Depends(get_chat_repository),
+):
+    removed = await chat_repository.remove_members(chat_id, user_ids, current_user.id)
+    return {"removed": removed}
+
 @chat_router.get("/user_chats/{user_id}", response_model=list[ChatOut])
 async def get_user_chats(
+    request: Request,
     user_id: str, 
-    chat_repository: ChatRepository = Depends(get_chat_repository)
+    chat_repository: ChatRepository = Depends(get_chat_read_repository)
 ):
-    try:
-        query = (
-            select(Chat)
-            .join(UserChat)
-            .join(User)
-            .filter(User.id == user_id)
-            .options(selectinload(Chat.users))
-        )
-        
-        result = await chat_repository.db.execute(query)
+    async def produce():
+        try:
+            return chats_adapter.dump_json(await chat_repository.get_user_chats(user_id))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        return result.scalars().all()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    return await response_cache.respond(request, response_cache.key("chats", "user", user_id), produce)
 
 @chat_router.get("/my_chats/{status}")
 async def get_my_chats(
+    status: int,
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
     current_user: User = Depends(get_current_user),  
-    chat_repository: ChatRepository = Depends(get_chat_repository),
+    chat_repository: ChatRepository = Depends(get_chat_read_repository),
 ):
     try:
-        query = (
-            select(Chat)
-            .join(UserChat)
-            .join(User)
-            .filter(User.id == current_user.id)
-            .options(selectinload(Chat.users))
-        )
-
-        result = await chat_repository.db.execute(query)
-        chats = result.scalars().all()
-
-        chat_partners = []
-
-        for chat in chats:
-            partner_users = [user for user in chat.users if user.id != current_user.id]
-            chat_partners.append(
-                {
-                    "chat_id": chat.id,
-                    "chat_name": chat.name,
-                    "status": chat.status,
-                    "partners": [
-                        {"user_id": partner.id, "username": partner.username}
-                        for partner in partner_users
-                    ],
-                }
-            )
-
-        return chat_partners
+        return await chat_repository.get_my_chats(current_user, status, limit, offset)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @chat_router.get("/all_chats/{status}", response_model=list[ChatOut])
 async def get_all_chats(
-    chat_repository: ChatRepository = Depends(get_chat_repository),
+    request: Request,
+    status: int,
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    chat_repository: ChatRepository = Depends(get_chat_read_repository),
 ):
-    try:
-        query = select(Chat).options(selectinload(Chat.users))
+    async def produce():
+        try:
+            return chats_adapter.dump_json(await chat_repository.get_all_chats(status, limit, offset))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        result = await chat_repository.db.execute(query)
+    return await response_cache.respond(request, response_cache.key("chats", "all", status, limit, offset), produce)
 
-        return result.unique().scalars().all()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+@chat_router.post("/mark_read/{chat_id}", response_model=ReadState)
+async def mark_read(
+    chat_id: int,
+    message_id: int = Query(description="Everything up to and including this message is read"),
+    current_user: User = Depends(get_current_user),
+    chat_repository: ChatRepository = Depends(get_chat_repository),
+):
+    return await chat_repository.mark_read(chat_id, current_user.id, message_id)
+
+@chat_router.post("/mark_delivered/{chat_id}", response_model=ReadState)
+async def mark_delivered(
+    chat_id: int,
+    message_id: int = Query(description="Everything up to and including this message is delivered"),
+    current_user: User = Depends(get_current_user),
+    chat_repository: ChatRepository = Depends(get_chat_repository),
+):
+    return await chat_repository.mark_delivered(chat_id, current_user.id, message_id)
@@ -0,0 +1,157 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, LargeBinary, String, func, select, tuple_
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import DeclarativeBase
+from decouple import config as env
+from datetime import datetime
+import zlib
+
+from config.db import apply_sqlite_pragmas
+from metrics import instrument_engine
+from .models import Message
+
+ARCHIVE_DATABASE_URL = env("ARCHIVE_DATABASE_URL", default="sqlite+aiosqlite:///./archive.db")
+
+
+class ArchiveBase(DeclarativeBase):
+    pass
+
+
+class ArchivedMessage(ArchiveBase):
+    """Cold copy of a message; the text is stored zlib-compressed."""
+
+    __tablename__ = "archived_messages"
+    __table_args__ = (
+        Index("ix_archived_messages_chat_id_time_delivered_id", "chat_id", "time_delivered", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(Integer, nullable=False)
+    sender_id = Column(String(36))
+    receiver_id = Column(String(36), nullable=True)
+    is_delivered = Column(Boolean)
+    time_delivered = Column(DateTime)
+    body = Column(LargeBinary)
+
+    @property
+    def text(self) -> str|None:
+        return zlib.decompress(self.body).decode("utf-8") if self.body is not None else None
+
+
+archive_engine = create_async_engine(ARCHIVE_DATABASE_URL)
+apply_sqlite_pragmas(archive_engine)
+instrument_engine(archive_engine)
+archive_session_maker = async_sessionmaker(archive_engine, expire_on_commit=False)
+
+_schema_ready = False
+
+
+async def ensure_archive_schema():
+    global _schema_ready
+    if not _schema_ready:
+        async with archive_engine.begin() as conn:
+            await conn.run_sync(ArchiveBase.metadata.create_all)
+        _schema_ready = True
+
+
+def to_row(message: ArchivedMessage) -> dict:
+    """Same shape as MessageRepository's `as_rows` dicts."""
+    return {
+        "text": message.text,
+        "id": message.id,
+        "receiver_id": message.receiver_id,
+        "time_delivered": message.time_delivered,
+        "chat_id": message.chat_id,
+    }
+
+
+async def archive_messages(messages: list[Message]):
+    """Copy messages into the archive; already archived ids are left alone."""
+    await ensure_archive_schema()
+    async with archive_session_maker() as session:
+        await session.execute(
+            insert(ArchivedMessage).on_conflict_do_nothing(),
+            [
+                {
+                    "id": message.id,
+                    "chat_id": message.chat_id,
+                    "sender_id": message.sender_id,
+                    "receiver_id": message.receiver_id,
+                    "is_delivered": message.is_delivered,
+                    "time_delivered": message.time_delivered,
+                    "body": zlib.compress(message.text.encode("utf-8")) if message.text is not None else None,
+                }
+                for message in messages
+            ],
+        )
+        await session.commit()
+
+
+async def archived_time(message_id: int, chat_id: int|None = None) -> datetime|None:
+    await ensure_archive_schema()
+    query = select(ArchivedMessage.time_delivered).where(ArchivedMessage.id == message_id)
+    if chat_id is not None:
+        query = query.where(ArchivedMessage.chat_id == chat_id)
+    async with archive_session_maker() as session:
+        result = await session.execute(query)
+        return result.scalar_one_or_none()
+
+
+async def archived_texts(message_ids: list[int]) -> dict[int, str|None]:
+    """message id -> text for those of `message_ids` that are archived."""
+    if not message_ids:
+        return {}
+    await ensure_archive_schema()
+    query = select(ArchivedMessage.id, ArchivedMessage.body).where(ArchivedMessage.id.in_(message_ids))
+    async with archive_session_maker() as session:
+        result = await session.execute(query)
+        return {id: zlib.decompress(body).decode("utf-8") if body is not None else None for id, body in result}
+
+
+async def archived_count_after(chat_id: int, key: tuple) -> int:
+    """How many archived messages of the chat come after the (time_delivered, id) `key`."""
+    await ensure_archive_schema()
+    query = (
+        select(func.count())
+        .select_from(ArchivedMessage)
+        .where(ArchivedMessage.chat_id == chat_id, tuple_(ArchivedMessage.time_delivered, ArchivedMessage.id) > tuple_(*key))
+    )
+    async with archive_session_maker() as session:
+        return await session.scalar(query)
+
+
+async def archived_page(
+    chat_id: int, before_key: tuple|None = None, after_key: tuple|None = None, limit: int = 50, descending: bool = True
+) -> list[ArchivedMessage]:
+    """Keyset page over (time_delivered, id), in the requested direction."""
+    await ensure_archive_schema()
+    key = tuple_(ArchivedMessage.time_delivered, ArchivedMessage.id)
+    query = select(ArchivedMessage).where(ArchivedMessage.chat_id == chat_id)
+    if before_key is not None:
+        query = query.where(key < tuple_(*before_key))
+    if after_key is not None:
+        query = query.where(key > tuple_(*after_key))
+
+    if descending:
+        query = query.order_by(ArchivedMessage.time_delivered.desc(), ArchivedMessage.id.desc())
+    else:
+        query = query.order_by(ArchivedMessage.time_delivered, ArchivedMessage.id)
+
+    async with archive_session_maker() as session:
+        result = await session.execute(query.limit(limit))
+        return result.scalars().all()
+
+
+async def stream_archived(chat_id: int, chunk_size: int = 1000):
+    """Yield the archived part of a chat, oldest first, as lists of row dicts."""
+    await ensure_archive_schema()
+    query = (
+        select(ArchivedMessage)
+        .where(ArchivedMessage.chat_id == chat_id)
+        .order_by(ArchivedMessage.time_delivered, ArchivedMessage.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    async with archive_session_maker() as session:
+        result = await session.stream_scalars(query)
+        async for partition in result.partitions(chunk_size):
+            yield [to_row(message) for message in partition]
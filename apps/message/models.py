@@ -1,5 +1,5 @@
 from sqlalchemy.orm import relationship
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String, DateTime
 from datetime import datetime
 
 from config.db import Base
@@ -7,6 +7,13 @@ from config.db import Base
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_chat_id_time_delivered_id", "chat_id", "time_delivered", "id"),
+        Index("ix_messages_sender_id_time_delivered_id", "sender_id", "time_delivered", "id"),
+        Index("ix_messages_time_delivered_id", "time_delivered", "id"),
+        # ids of archived messages must not be handed out again
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     text = Column(String)
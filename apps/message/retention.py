@@ -0,0 +1,98 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, update
+from decouple import config as env
+import asyncio
+import logging
+
+from apps.chat.models import Chat
+from config.db import async_session_maker
+from .archive import archive_messages
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionJob:
+    """Moves messages past their chat's retention_days into the archive database.
+
+    Works in batches of `batch_size` messages, oldest first. Each batch is
+    copied to the archive, then deleted from `messages` (and the chat's
+    archived_until advanced) in its own short transaction, so the hot database
+    is never write-locked for long.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker, batch_size: int = 500, interval: float = 3600, pause: float = 0.05, enabled: bool = True):
+        self.session_maker = session_maker
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+        self.enabled = enabled
+        self.archived_total = 0
+        self._task: asyncio.Task|None = None
+
+    async def run_once(self) -> int:
+        async with self.session_maker() as session:
+            result = await session.execute(select(Chat.id, Chat.retention_days).where(Chat.retention_days.is_not(None)))
+            policies = result.all()
+
+        archived = 0
+        now = datetime.utcnow()
+        for chat_id, retention_days in policies:
+            archived += await self.archive_chat(chat_id, now - timedelta(days=retention_days))
+        return archived
+
+    async def archive_chat(self, chat_id: int, cutoff: datetime) -> int:
+        archived = 0
+        while True:
+            async with self.session_maker() as session:
+                result = await session.execute(
+                    select(Message)
+                    .where(Message.chat_id == chat_id, Message.time_delivered < cutoff)
+                    .order_by(Message.time_delivered, Message.id)
+                    .limit(self.batch_size)
+                )
+                batch = result.scalars().all()
+            if not batch:
+                return archived
+
+            await archive_messages(batch)
+
+            async with self.session_maker() as session:
+                await session.execute(delete(Message).where(Message.id.in_([message.id for message in batch])))
+                await session.execute(update(Chat).where(Chat.id == chat_id).values(archived_until=batch[-1].time_delivered))
+                await session.commit()
+
+            archived += len(batch)
+            self.archived_total += len(batch)
+            await asyncio.sleep(self.pause)
+
+    async def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("message retention run failed")
+            await asyncio.sleep(self.interval)
+
+
+retention_job = RetentionJob(
+    async_session_maker,
+    batch_size=env("RETENTION_BATCH_SIZE", default=500, cast=int),
+    interval=env("RETENTION_INTERVAL", default=3600, cast=float),
+    enabled=env("RETENTION_ENABLED", default=False, cast=bool),
+)
@@ -0,0 +1,29 @@
+from sqlalchemy import DDL, column, event, table
+
+from .models import Message
+
+
+# external-content FTS5 index over messages.text, keyed by messages.id
+messages_fts = table("messages_fts", column("rowid"))
+
+FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(text, content='messages', content_rowid='id')",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF text ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO messages_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+]
+
+for statement in FTS_DDL:
+    event.listen(Message.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+
+def fts_query(text: str) -> str:
+    """Quote every word so user input is matched literally instead of as FTS5 syntax."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
@@ -1,20 +1,38 @@
-from fastapi import Depends, APIRouter, Query
+from fastapi import Body, Depends, APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Annotated, Literal
+from datetime import datetime
+import zlib
 from .schemas import MessageCreate, MessageOutput
-from repositories import MessageRepository, get_message_repository
+from repositories import MessageRepository, get_message_repository, get_message_read_repository
 from apps.user.auth import User, get_current_user
+from responses import FAST_JSON, FastJSONResponse, dumps
+from ratelimit import send_message_limit
+from config.db import read_session_maker
 
 message_router = APIRouter()
 
 @message_router.get("/messages", response_model=list[MessageOutput])
 async def get_messages(
-    sender_id: str = Query(None),
-    time_delivered: str = Query(None),
-    message_repository: MessageRepository = Depends(get_message_repository),
+    chat_id: Annotated[list[int]|None, Query(description="Chat ids; repeat to filter on several")] = None,
+    sender_id: Annotated[list[str]|None, Query(description="Sender ids; repeat to filter on several")] = None,
+    since: Annotated[datetime|None, Query(description="Delivered at or after")] = None,
+    until: Annotated[datetime|None, Query(description="Delivered before")] = None,
+    order: Annotated[Literal["asc", "desc"], Query()] = "asc",
+    after: Annotated[int|None, Query(description="Id of the last message of the previous page")] = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+    current_user: User = Depends(get_current_user),
+    message_repository: MessageRepository = Depends(get_message_read_repository),
 ):
-    messages_data = await message_repository.get_messages(sender_id, time_delivered)
+    descending = order == "desc"
+    if FAST_JSON:
+        rows = await message_repository.get_messages(current_user.id, chat_id, sender_id, since, until, descending, after, limit, as_rows=True)
+        return FastJSONResponse(rows)
+
+    messages_data = await message_repository.get_messages(current_user.id, chat_id, sender_id, since, until, descending, after, limit)
     return messages_data
 
-@message_router.post("/send_message", response_model=MessageOutput)
+@message_router.post("/send_message", response_model=MessageOutput, dependencies=[Depends(send_message_limit)])
 async def send_message(
     message_data: MessageCreate,
     current_user: User = Depends(get_current_user),
@@ -23,10 +41,70 @@ async def send_message(
     new_message = await message_repository.send_message(message_data, current_user.id)
     return new_message
 
+@message_router.post("/send_batch", response_model=list[MessageOutput])
+async def send_batch(
+    request: Request,
+    messages_data: Annotated[list[MessageCreate], Body(min_length=1, max_length=1000)],
+    current_user: User = Depends(get_current_user),
+    message_repository: MessageRepository = Depends(get_message_repository),
+):
+    # each message of the batch counts against the send_message quota
+    await send_message_limit.check(request, cost=len(messages_data))
+    new_messages = await message_repository.send_messages(messages_data, current_user.id)
+    return new_messages
+
 @message_router.post("/get_chat_messages", response_model=list[MessageOutput])
 async def get_messages_in_chat(
     chat_id: int = Query(description="Chat id"),
-    message_repository: MessageRepository = Depends(get_message_repository),
+    before: int|None = Query(None, description="Return messages older than this message id"),
+    after: int|None = Query(None, description="Return messages newer than this message id"),
+    limit: int = Query(50, ge=1, le=500, description="Page size"),
+    current_user: User = Depends(get_current_user),
+    message_repository: MessageRepository = Depends(get_message_read_repository),
 ):
-    chat_messages = await message_repository.get_messages_in_chat(chat_id)
+    if FAST_JSON:
+        rows = await message_repository.get_messages_in_chat(chat_id, current_user.id, before, after, limit, as_rows=True)
+        return FastJSONResponse(rows)
+
+    chat_messages = await message_repository.get_messages_in_chat(chat_id, current_user.id, before, after, limit)
     return chat_messages
+
+@message_router.get("/search", response_model=list[MessageOutput])
+async def search_messages(
+    q: str = Query(min_length=1, description="Words to search for"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    message_repository: MessageRepository = Depends(get_message_read_repository),
+):
+    messages = await message_repository.search_messages(q, current_user.id, limit, offset)
+    return messages
+
+@message_router.get("/export/{chat_id}")
+async def export_chat(
+    chat_id: int,
+    gzip: bool = Query(False, description="gzip-compress the stream"),
+    chunk_size: int = Query(1000, ge=1, le=10000),
+    current_user: User = Depends(get_current_user),
+    message_repository: MessageRepository = Depends(get_message_read_repository),
+):
+    await message_repository.require_member(chat_id, current_user.id)
+
+    async def ndjson():
+        # the body outlives the request's dependencies, so the stream owns its session
+        async with read_session_maker() as session:
+            async for chunk in MessageRepository(session).stream_messages_in_chat(chat_id, chunk_size):
+                yield b"".join(dumps(row) + b"\n" for row in chunk)
+
+    async def gzipped():
+        compressor = zlib.compressobj(wbits=31)
+        async for data in ndjson():
+            compressed = compressor.compress(data)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    headers = {"Content-Disposition": f'attachment; filename="chat-{chat_id}.ndjson{".gz" if gzip else ""}"'}
+    if gzip:
+        return StreamingResponse(gzipped(), media_type="application/gzip", headers=headers)
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson", headers=headers)
@@ -0,0 +1,108 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from decouple import config as env
+from sqlalchemy import insert
+import asyncio
+
+from apps.chat.summary import record_messages
+from config.db import async_session_maker
+from .models import Message
+
+
+class MessageWriter:
+    """Write-behind queue that group-commits messages.
+
+    Callers enqueue row values and wait; a background task gathers up to
+    `max_batch` pending rows, or whatever arrived within `max_latency` seconds
+    of the first one, inserts them in one transaction and then resolves every
+    caller of that batch with its persisted Message. If the batch fails, its
+    rows are retried one transaction each, so only the offending caller gets
+    the error.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker, max_batch: int = 500, max_latency: float = 0.005, enabled: bool = True):
+        self.session_maker = session_maker
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.enabled = enabled
+        self._queue: asyncio.Queue[tuple[dict, asyncio.Future]]|None = None
+        self._task: asyncio.Task|None = None
+        self.batches = 0
+        self.written = 0
+
+    async def start(self):
+        if self._task is not None and not self._task.done():
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still queued, then stop the background task."""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def submit(self, values: dict) -> Message:
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((values, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_latency
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: list[tuple[dict, asyncio.Future]]):
+        try:
+            async with self.session_maker() as session:
+                result = await session.scalars(
+                    insert(Message).returning(Message, sort_by_parameter_order=True),
+                    [values for values, _ in batch],
+                )
+                messages = result.all()
+                await record_messages(session, messages)
+                await session.commit()
+        except Exception as e:
+            if len(batch) > 1:
+                for item in batch:
+                    await self._flush([item])
+                return
+            _, future = batch[0]
+            if not future.done():
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.written += len(messages)
+        for (_, future), message in zip(batch, messages):
+            if not future.done():
+                future.set_result(message)
+
+
+message_writer = MessageWriter(
+    async_session_maker,
+    max_batch=env("WRITE_BEHIND_MAX_BATCH", default=500, cast=int),
+    max_latency=env("WRITE_BEHIND_MAX_LATENCY_MS", default=5, cast=float) / 1000,
+    enabled=env("WRITE_BEHIND", default=False, cast=bool),
+)
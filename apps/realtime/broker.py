@@ -0,0 +1,206 @@
+from decouple import config as env
+import asyncio
+import json
+import logging
+
+from .hub import ChatHub, hub
+
+logger = logging.getLogger(__name__)
+
+
+class Broker:
+    """Carries published messages to the ChatHub of every worker."""
+
+    def __init__(self, hub: ChatHub):
+        self.hub = hub
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, chat_id: int, payload: dict):
+        raise NotImplementedError
+
+
+class InMemoryBroker(Broker):
+    """Single-process broker: publishing is a direct hand-off to the local hub."""
+
+    async def publish(self, chat_id: int, payload: dict):
+        self.hub.publish(chat_id, payload)
+
+
+class BrokerServer:
+    """Relay that echoes every newline-delimited frame to all connected workers.
+
+    Frames are queued to every worker in arrival order, so every worker sees
+    the messages of a chat in the same order. Each worker has its own bounded
+    queue and writer task; a worker whose queue fills up is disconnected
+    (it reconnects on its own) instead of stalling delivery to the others.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, max_queue: int = 1024):
+        self.host = host
+        self.port = port
+        self.max_queue = max_queue
+        self.dropped_total = 0
+        self._server: asyncio.Server|None = None
+        self._clients: dict[asyncio.StreamWriter, tuple[asyncio.Queue, asyncio.Task]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._clients):
+            self._disconnect(writer)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        queue = asyncio.Queue(self.max_queue)
+        sender = asyncio.create_task(self._send(writer, queue))
+        self._clients[writer] = (queue, sender)
+        self._tasks.update((asyncio.current_task(), sender))
+        try:
+            while line := await reader.readline():
+                for client, (client_queue, _) in list(self._clients.items()):
+                    try:
+                        client_queue.put_nowait(line)
+                    except asyncio.QueueFull:
+                        self.dropped_total += 1
+                        logger.warning("disconnecting broker client that fell %d frames behind", self.max_queue)
+                        self._disconnect(client)
+        except ConnectionError:
+            pass
+        finally:
+            self._disconnect(writer)
+            self._tasks.discard(asyncio.current_task())
+
+    async def _send(self, writer: asyncio.StreamWriter, queue: asyncio.Queue):
+        try:
+            while True:
+                writer.write(await queue.get())
+                await writer.drain()
+        except ConnectionError:
+            self._disconnect(writer)
+        finally:
+            self._tasks.discard(asyncio.current_task())
+
+    def _disconnect(self, writer: asyncio.StreamWriter):
+        client = self._clients.pop(writer, None)
+        if client is None:
+            return
+        _, sender = client
+        if sender is not asyncio.current_task():
+            sender.cancel()
+        writer.close()
+
+
+class SocketBroker(Broker):
+    """Cross-worker broker over a local TCP relay.
+
+    The first worker to start binds the relay (unless `embed_server` is off);
+    every worker, including that one, connects to it as a client. Messages
+    published while the relay is unreachable are only delivered locally.
+    """
+
+    def __init__(self, hub: ChatHub, host: str = "127.0.0.1", port: int = 8765, embed_server: bool = True):
+        super().__init__(hub)
+        self.host = host
+        self.port = port
+        self.embed_server = embed_server
+        self.server: BrokerServer|None = None
+        self._reader: asyncio.StreamReader|None = None
+        self._writer: asyncio.StreamWriter|None = None
+        self._reader_task: asyncio.Task|None = None
+        self._stopping = False
+
+    async def start(self):
+        self._stopping = False
+        try:
+            await self._connect()
+        except OSError as e:
+            # the reader task keeps trying to connect
+            logger.warning("broker relay %s:%d unreachable, delivering locally: %s", self.host, self.port, e)
+        self._reader_task = asyncio.create_task(self._read())
+
+    async def stop(self):
+        self._stopping = True
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self.server is not None:
+            await self.server.stop()
+            self.server = None
+
+    async def publish(self, chat_id: int, payload: dict):
+        if self._reader_task is None:
+            await self.start()
+        if self._writer is None:
+            self.hub.publish(chat_id, payload)
+            return
+        frame = json.dumps({"chat_id": chat_id, "payload": payload}, separators=(",", ":"))
+        try:
+            self._writer.write(frame.encode() + b"\n")
+            await self._writer.drain()
+        except ConnectionError as e:
+            # the reader task reconnects; until then this worker's sockets still get the message
+            logger.warning("broker relay connection lost, delivering locally: %s", e)
+            self._writer = None
+            self.hub.publish(chat_id, payload)
+
+    async def _connect(self):
+        if self.embed_server and self.server is None:
+            server = BrokerServer(self.host, self.port)
+            try:
+                await server.start()
+                self.server = server
+            except OSError:
+                pass
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def _read(self):
+        while not self._stopping:
+            line = b""
+            if self._reader is not None:
+                try:
+                    line = await self._reader.readline()
+                except ConnectionError:
+                    pass
+            if line:
+                try:
+                    frame = json.loads(line)
+                    self.hub.publish(frame["chat_id"], frame["payload"])
+                except (ValueError, KeyError, TypeError):
+                    logger.warning("dropping malformed broker frame: %.200r", line)
+                continue
+
+            self._reader = self._writer = None
+            await asyncio.sleep(0.5)
+            try:
+                await self._connect()
+            except OSError:
+                pass
+
+
+def create_broker(hub: ChatHub) -> Broker:
+    if env("BROKER", default="memory") == "socket":
+        return SocketBroker(
+            hub,
+            host=env("BROKER_HOST", default="127.0.0.1"),
+            port=env("BROKER_PORT", default=8765, cast=int),
+        )
+    return InMemoryBroker(hub)
+
+
+broker = create_broker(hub)
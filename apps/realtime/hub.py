@@ -0,0 +1,75 @@
+from collections import defaultdict
+from decouple import config as env
+import asyncio
+
+
+class Subscription:
+    def __init__(self, chat_id: int, max_queue: int, user_id: str|None = None):
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.queue: asyncio.Queue[dict|None] = asyncio.Queue(maxsize=max_queue)
+        self.dropped = False
+        self.removed = False
+
+    async def get(self) -> dict|None:
+        """Next payload, or None once the hub has dropped this subscriber."""
+        return await self.queue.get()
+
+
+class ChatHub:
+    """Per-chat fan-out of published messages to the sockets of this process.
+
+    Every subscriber has its own bounded queue. Publishing never waits: a
+    subscriber whose queue is full is considered too slow, its backlog is
+    discarded and it is told to disconnect.
+    """
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._subscribers: dict[int, set[Subscription]] = defaultdict(set)
+        self.dropped_total = 0
+
+    def subscribe(self, chat_id: int, user_id: str|None = None) -> Subscription:
+        subscription = Subscription(chat_id, self.max_queue, user_id)
+        self._subscribers[chat_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.chat_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.chat_id]
+
+    def publish(self, chat_id: int, payload: dict):
+        for subscription in list(self._subscribers.get(chat_id, ())):
+            try:
+                subscription.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def drop_members(self, chat_id: int, user_ids: list[str]):
+        """Disconnect the subscribers of `chat_id` that belong to `user_ids`, e.g. once they leave the chat."""
+        user_ids = set(user_ids)
+        for subscription in list(self._subscribers.get(chat_id, ())):
+            if subscription.user_id in user_ids:
+                subscription.removed = True
+                self._close(subscription)
+
+    def subscriber_count(self, chat_id: int) -> int:
+        return len(self._subscribers.get(chat_id, ()))
+
+    def _drop(self, subscription: Subscription):
+        subscription.dropped = True
+        self.dropped_total += 1
+        self._close(subscription)
+
+    def _close(self, subscription: Subscription):
+        self.unsubscribe(subscription)
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+
+hub = ChatHub(max_queue=env("WS_SEND_QUEUE", default=100, cast=int))
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+import asyncio
+
+from apps.chat.membership import membership_cache
+from apps.user.auth import get_user_from_token
+from config.db import async_session_maker
+from .hub import hub
+
+ws_router = APIRouter()
+
+
+@ws_router.websocket("/chats/{chat_id}")
+async def chat_socket(
+    websocket: WebSocket,
+    chat_id: int,
+    token: str = Query(description="JWT access token from /auth/jwt/login"),
+):
+    try:
+        async with async_session_maker() as db:
+            user = await get_user_from_token(token, db)
+            is_member = await membership_cache.is_member(db, chat_id, user.id)
+    except HTTPException:
+        is_member = False
+    if not is_member:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = hub.subscribe(chat_id, user.id)
+
+    async def still_member() -> bool:
+        # remove_members drops this worker's sockets itself; the cache, which
+        # expires, catches removals made through another worker
+        async with async_session_maker() as db:
+            return await membership_cache.is_member(db, chat_id, user.id)
+
+    async def forward():
+        while True:
+            payload = await subscription.get()
+            if payload is None and not subscription.removed:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Client too slow")
+                return
+            if payload is None or not await still_member():
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Removed from chat")
+                return
+            await websocket.send_json(payload)
+
+    async def drain():
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    tasks = [asyncio.create_task(forward()), asyncio.create_task(drain())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        hub.unsubscribe(subscription)
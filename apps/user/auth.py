@@ -4,10 +4,12 @@ from sqlalchemy.orm import relationship
 from sqlalchemy import Column, String, select
 from fastapi import HTTPException, Depends
 from typing import Annotated
+from decouple import config as env
 from jose import jwt, JWTError
 import uuid
 
 from config.db import get_async_session, Base
+from cache import TTLCache
 
 
 
@@ -18,10 +20,16 @@ ALGORITHM = "HS256"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/jwt/login")
 
+# user id (the token's "sub") -> User, so authenticated requests skip the lookup query
+principal_cache = TTLCache(
+    maxsize=env("AUTH_CACHE_SIZE", default=10000, cast=int),
+    ttl=env("AUTH_CACHE_TTL", default=300, cast=float),
+)
+
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(String(36), primary_key=True, default=str(uuid.uuid4()), unique=True, nullable=False, index=True)
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), unique=True, nullable=False, index=True)
     username = Column(String, unique=True, nullable=False)
     photo_url = Column(String(), nullable=True)
     password = Column(String, nullable=False)
@@ -31,16 +39,32 @@ class User(Base):
 
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], db: AsyncSession = Depends(get_async_session)):
+    return await get_user_from_token(token, db)
+
+
+async def get_user_from_token(token: str, db: AsyncSession) -> User:
     try:
         payload = jwt.decode(token, SECRET, algorithms=[ALGORITHM])
-        username = payload.get("username")
+        user_id = payload.get("sub")
+
+        if user_id is None:
+            raise HTTPException(status_code=401, detail="Could not validate credentials")
 
-        user = await db.execute(select(User).where(User.username == username))
+        user = principal_cache.get(user_id)
+        if user is not None:
+            return user
+
+        user = await db.execute(select(User).where(User.id == user_id))
         user = user.scalar_one_or_none()
 
         if user is None:
             raise HTTPException(status_code=401, detail="User not found")
 
+        principal_cache.set(user_id, user)
         return user
     except JWTError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
+
+
+def invalidate_principal(user_id: str):
+    principal_cache.invalidate(user_id)
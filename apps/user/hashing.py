@@ -0,0 +1,89 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException
+from decouple import config as env
+import asyncio
+import time
+import bcrypt
+
+
+def _hash(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+
+
+def _check(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a worker pool so it never blocks the event loop.
+
+    At most `max_workers + max_queue` calls are admitted at once; anything
+    beyond that is rejected with 503 instead of piling up behind the pool.
+    """
+
+    def __init__(self, rounds: int = 12, max_workers: int = 4, max_queue: int = 64, executor: str = "thread"):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor_kind = executor
+        self._executor: Executor|None = None
+        self._in_flight = 0
+        self._hashes = 0
+        self._rejected = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(_hash, password.encode('utf-8'), self.rounds)
+        return hashed.decode('utf-8')
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(_check, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    async def _run(self, func, *args):
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            raise HTTPException(status_code=503, detail="Server is busy, try again later", headers={"Retry-After": "1"})
+
+        self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self._in_flight -= 1
+            elapsed = time.perf_counter() - started
+            self._hashes += 1
+            self._latency_total += elapsed
+            self._latency_max = max(self._latency_max, elapsed)
+
+    def metrics(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "queue_depth": max(self._in_flight - self.max_workers, 0),
+            "hashes_total": self._hashes,
+            "rejected_total": self._rejected,
+            "latency_seconds_total": self._latency_total,
+            "latency_seconds_max": self._latency_max,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    rounds=env("BCRYPT_ROUNDS", default=12, cast=int),
+    max_workers=env("BCRYPT_WORKERS", default=4, cast=int),
+    max_queue=env("BCRYPT_MAX_QUEUE", default=64, cast=int),
+    executor=env("BCRYPT_EXECUTOR", default="thread"),
+)
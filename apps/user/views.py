@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.exc import IntegrityError
+from pydantic import TypeAdapter
 from typing import Annotated
 
 from .schemas import UserCreate, UserRead
-from repositories import UserRepository, get_user_repository
+from cache import response_cache
+from ratelimit import login_limit
+from repositories import UserRepository, get_user_repository, get_user_read_repository
 
 user_routes = APIRouter()
 
+users_adapter = TypeAdapter(list[UserRead])
+
 
 @user_routes.post("/register", response_model=UserRead)
 async def register(user: UserCreate, user_repository: UserRepository = Depends(get_user_repository)):
@@ -24,28 +29,45 @@ async def register(user: UserCreate, user_repository: UserRepository = Depends(g
 
 
 @user_routes.get("/users/", response_model=list[UserRead])
-async def get_users(user_repository: UserRepository = Depends(get_user_repository)):
-    users = await user_repository.get_users()
+async def get_users(request: Request, user_repository: UserRepository = Depends(get_user_read_repository)):
+    async def produce():
+        return users_adapter.dump_json(await user_repository.get_users())
+
+    return await response_cache.respond(request, response_cache.key("users", "all"), produce)
+
+
+@user_routes.get("/users/search", response_model=list[UserRead])
+async def search_users(
+        q: Annotated[str, Query(description="username prefix")] = "",
+        after: Annotated[str|None, Query(description="last username of the previous page")] = None,
+        limit: Annotated[int, Query(ge=1, le=100)] = 20,
+        user_repository: UserRepository = Depends(get_user_read_repository)):
+    users = await user_repository.search_users(q, after, limit)
     return users
 
 
 @user_routes.get("/user/", response_model=UserRead)
 async def get_user(
+        request: Request,
         username: Annotated[str|None, Query(description="username to search")] = None,
         uuid: Annotated[str|None, Query(description="UUID to search")] = None,
-        user_repository: UserRepository = Depends(get_user_repository)):
+        user_repository: UserRepository = Depends(get_user_read_repository)):
 
-    if uuid:
-        user = await user_repository.get_user_by_id(uuid)
-    elif username:
-        user = await user_repository.get_user_by_username(username)
-    else:
+    if not uuid and not username:
         raise HTTPException(status_code=400, detail="Username or UUID to delete")
 
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
+    async def produce():
+        if uuid:
+            user = await user_repository.get_user_by_id(uuid)
+        else:
+            user = await user_repository.get_user_by_username(username)
+
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        return UserRead.model_validate(user).model_dump_json().encode()
 
-    return user
+    return await response_cache.respond(request, response_cache.key("users", uuid, username), produce)
 
 
 @user_routes.delete("/user/")
@@ -69,10 +91,10 @@ async def delete_user(
     return {"message": "User deleted successfully"}
 
 
-@user_routes.post("/jwt/login")
+@user_routes.post("/jwt/login", dependencies=[Depends(login_limit)])
 async def login_user(
         form_data: OAuth2PasswordRequestForm = Depends(),
-        user_repository: UserRepository = Depends(get_user_repository)
+        user_repository: UserRepository = Depends(get_user_read_repository)
         ):
 
     response = await user_repository.login_user(form_data)
@@ -0,0 +1,53 @@
+"""Cross-worker fan-out latency of the socket broker.
+
+Simulates WORKERS uvicorn workers in one process, each with its own hub and
+broker connection to a shared relay, publishes MESSAGES messages from worker 0
+and measures publish -> delivery latency on every other worker.
+
+    python -m benchmarks.broker_fanout --workers 4 --messages 2000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from apps.realtime.broker import BrokerServer, SocketBroker
+from apps.realtime.hub import ChatHub
+
+
+async def run(workers: int, messages: int, chat_id: int = 1):
+    server = BrokerServer("127.0.0.1", 0)
+    await server.start()
+
+    brokers = [SocketBroker(ChatHub(max_queue=messages + 1), port=server.port, embed_server=False) for _ in range(workers)]
+    for broker in brokers:
+        await broker.start()
+    subscriptions = [broker.hub.subscribe(chat_id) for broker in brokers[1:]]
+
+    latencies = []
+    started = time.perf_counter()
+    for i in range(messages):
+        await brokers[0].publish(chat_id, {"id": i, "sent": time.perf_counter()})
+        for subscription in subscriptions:
+            payload = await subscription.get()
+            assert payload["id"] == i, "out of order delivery"
+            latencies.append(time.perf_counter() - payload["sent"])
+    elapsed = time.perf_counter() - started
+
+    for broker in brokers:
+        await broker.stop()
+    await server.stop()
+
+    latencies.sort()
+    quantile = lambda q: latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000
+    print(f"workers={workers} messages={messages} deliveries={len(latencies)}")
+    print(f"throughput: {messages / elapsed:.0f} msg/s")
+    print(f"latency ms: p50={quantile(0.5):.3f} p95={quantile(0.95):.3f} p99={quantile(0.99):.3f} mean={statistics.mean(latencies) * 1000:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.workers, args.messages))
@@ -0,0 +1,204 @@
+"""Load test of the chat API against a seeded SQLite file database.
+
+Seeds USERS users, CHATS chats (each with MEMBERS members) and MESSAGES
+messages into a fresh database, starts the app in-process under uvicorn and
+drives it with CONCURRENCY async clients running a weighted mix of login,
+send_message, my_chats and get_chat_messages for DURATION seconds.
+Prints p50/p95/p99 latency and req/s per route and can write them as JSON
+(--output) to compare runs across commits.
+
+    python -m benchmarks.load --users 1000 --chats 200 --messages 100000 --duration 20 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+DIRECTORY = tempfile.mkdtemp(prefix="chat-load-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(DIRECTORY, 'load.db')}")
+os.environ.setdefault("ARCHIVE_DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(DIRECTORY, 'archive.db')}")
+# every simulated client shares one IP and logs in over and over
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import bcrypt
+import httpx
+import uvicorn
+
+from config.base import Base
+from config.db import engine
+from main import app
+
+PASSWORD = "loadtest"
+
+MIXES = {
+    "chat": {"send_message": 30, "my_chats": 30, "get_chat_messages": 35, "login": 5},
+    "write": {"send_message": 80, "get_chat_messages": 15, "login": 5},
+    "login": {"login": 100},
+}
+
+
+async def create_schema():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+def seed(path: str, users: int, chats: int, members: int, messages: int, seed: int) -> tuple[list[str], dict[str, list[int]]]:
+    """Bulk-insert the data set with plain sqlite3; returns usernames and each user's chats."""
+    rng = random.Random(seed)
+    password = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=int(os.environ.get("BCRYPT_ROUNDS", 12)))).decode()
+    user_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(users)]
+    usernames = [f"user{i:07d}" for i in range(users)]
+
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO users (id, username, password) VALUES (?, ?, ?)",
+        zip(user_ids, usernames, [password] * users),
+    )
+
+    now = datetime.utcnow()
+    chat_members: dict[int, list[str]] = {}
+    user_chats: dict[str, list[int]] = {}
+    for chat_id in range(1, chats + 1):
+        picked = rng.sample(range(users), min(members, users))
+        chat_members[chat_id] = [user_ids[i] for i in picked]
+        for i in picked:
+            user_chats.setdefault(usernames[i], []).append(chat_id)
+    conn.executemany("INSERT INTO chats (id, name, status, updated_at) VALUES (?, ?, 1, ?)", [(c, f"chat {c}", now) for c in chat_members])
+    conn.executemany(
+        "INSERT INTO userchats (chat_id, user_id) VALUES (?, ?)",
+        [(chat_id, user_id) for chat_id, ids in chat_members.items() for user_id in ids],
+    )
+
+    batch = []
+    for i in range(messages):
+        chat_id = rng.randint(1, chats)
+        batch.append((f"seeded message {i}", chat_id, rng.choice(chat_members[chat_id]), now - timedelta(seconds=messages - i)))
+        if len(batch) == 10000 or i == messages - 1:
+            conn.executemany("INSERT INTO messages (text, chat_id, sender_id, time_delivered, is_delivered) VALUES (?, ?, ?, ?, 1)", batch)
+            batch.clear()
+    conn.execute("""
+        UPDATE chats SET
+            message_count = (SELECT count(*) FROM messages WHERE messages.chat_id = chats.id),
+            last_message_id = (SELECT max(id) FROM messages WHERE messages.chat_id = chats.id)
+    """)
+    conn.execute("UPDATE chats SET last_message_at = (SELECT time_delivered FROM messages WHERE messages.id = chats.last_message_id)")
+    conn.commit()
+    conn.close()
+    return [name for name in usernames if name in user_chats], user_chats
+
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, usernames: list[str], user_chats: dict[str, list[int]], mix: dict[str, int], seed: int):
+        self.client = client
+        self.usernames = usernames
+        self.user_chats = user_chats
+        self.routes = list(mix)
+        self.weights = list(mix.values())
+        self.rng = random.Random(seed)
+        self.latencies: dict[str, list[float]] = {route: [] for route in mix}
+        self.errors: dict[str, int] = {route: 0 for route in mix}
+
+    async def login(self, username: str) -> str|None:
+        response = await self.timed("login", self.client.post("/auth/jwt/login", data={"username": username, "password": PASSWORD}))
+        return response.json()["access_token"] if response.status_code == 200 else None
+
+    async def timed(self, route: str, request):
+        started = time.perf_counter()
+        response = await request
+        if route in self.latencies:
+            self.latencies[route].append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                self.errors[route] += 1
+        return response
+
+    async def user_session(self, deadline: float):
+        username = self.rng.choice(self.usernames)
+        token = await self.login(username)
+        headers = {"Authorization": f"Bearer {token}"}
+        chats = self.user_chats[username]
+
+        while time.perf_counter() < deadline:
+            route = self.rng.choices(self.routes, self.weights)[0]
+            if route == "login":
+                await self.login(username)
+            elif route == "send_message":
+                body = {"text": "load test message", "chat_id": self.rng.choice(chats)}
+                await self.timed(route, self.client.post("/messages/send_message", json=body, headers=headers))
+            elif route == "my_chats":
+                await self.timed(route, self.client.get("/chat/my_chats/1", headers=headers))
+            elif route == "get_chat_messages":
+                await self.timed(route, self.client.post(f"/messages/get_chat_messages?chat_id={self.rng.choice(chats)}&limit=50", headers=headers))
+
+
+def summarize(latencies: dict[str, list[float]], errors: dict[str, int], elapsed: float) -> dict:
+    report = {}
+    for route, samples in latencies.items():
+        if not samples:
+            continue
+        samples = sorted(samples)
+        quantile = lambda q: round(samples[min(int(q * len(samples)), len(samples) - 1)] * 1000, 3)
+        report[route] = {
+            "requests": len(samples),
+            "errors": errors[route],
+            "rps": round(len(samples) / elapsed, 1),
+            "p50_ms": quantile(0.50),
+            "p95_ms": quantile(0.95),
+            "p99_ms": quantile(0.99),
+        }
+    return report
+
+
+async def run(args):
+    await create_schema()
+    path = engine.url.database
+    started = time.perf_counter()
+    usernames, user_chats = seed(path, args.users, args.chats, args.members, args.messages, args.seed)
+    print(f"seeded {args.users} users, {args.chats} chats, {args.messages} messages in {time.perf_counter() - started:.1f}s ({path})")
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning", lifespan="on"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=60) as client:
+        workload = Workload(client, usernames, user_chats, MIXES[args.mix], args.seed)
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(workload.user_session(deadline) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    server.should_exit = True
+    await server_task
+
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "elapsed_s": round(elapsed, 2),
+        "routes": summarize(workload.latencies, workload.errors, elapsed),
+    }
+    for route, stats in report["routes"].items():
+        print(f"{route:>18}: {stats['rps']:8.1f} req/s  p50={stats['p50_ms']:.1f}ms  p95={stats['p95_ms']:.1f}ms  p99={stats['p99_ms']:.1f}ms  errors={stats['errors']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--members", type=int, default=5)
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--mix", choices=MIXES, default="chat")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--output")
+    asyncio.run(run(parser.parse_args()))
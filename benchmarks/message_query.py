@@ -0,0 +1,120 @@
+"""Latency of GET /messages/messages style queries over a large messages table.
+
+Seeds ROWS messages (spread over CHATS chats and SENDERS senders, one per
+second going back in time) into a fresh SQLite file database created from
+the models, so every index of the schema is present, then times typical
+MessageRepository.get_messages queries, made as a reader who is a member of
+every chat, and prints the plan SQLite chose.
+
+    python -m benchmarks.message_query --rows 10000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+DIRECTORY = tempfile.mkdtemp(prefix="chat-query-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(DIRECTORY, 'query.db')}")
+os.environ.setdefault("ARCHIVE_DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(DIRECTORY, 'archive.db')}")
+
+from sqlalchemy import event
+
+from config.base import Base
+from config.db import engine, read_engine, read_session_maker
+from repositories import MessageRepository
+
+START = datetime(2024, 1, 1)
+READER = "reader"
+
+
+def seed(path: str, rows: int, chats: int, senders: int, seed: int):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    batch = []
+    for i in range(rows):
+        batch.append((f"message {i}", rng.randint(1, chats), f"sender-{rng.randint(1, senders)}", START + timedelta(seconds=i)))
+        if len(batch) == 50000:
+            conn.executemany("INSERT INTO messages (text, chat_id, sender_id, time_delivered, is_delivered) VALUES (?, ?, ?, ?, 1)", batch)
+            batch.clear()
+    if batch:
+        conn.executemany("INSERT INTO messages (text, chat_id, sender_id, time_delivered, is_delivered) VALUES (?, ?, ?, ?, 1)", batch)
+    conn.executemany("INSERT INTO userchats (chat_id, user_id) VALUES (?, ?)", [(chat_id, READER) for chat_id in range(1, chats + 1)])
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+async def run(args):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    path = engine.url.database
+
+    started = time.perf_counter()
+    seed(path, args.rows, args.chats, args.senders, args.seed)
+    print(f"seeded {args.rows} messages in {time.perf_counter() - started:.1f}s ({path})")
+
+    middle = START + timedelta(seconds=args.rows // 2)
+    cases = {
+        "one chat, latest": dict(chat_ids=[7], descending=True),
+        "three chats, range": dict(chat_ids=[3, 5, 7], since=middle, until=middle + timedelta(hours=6)),
+        "one sender, range": dict(sender_ids=["sender-42"], since=middle),
+        "time range only": dict(since=middle, until=middle + timedelta(minutes=10)),
+        "sender in chat": dict(chat_ids=[7], sender_ids=["sender-42"], descending=True),
+    }
+
+    conn = sqlite3.connect(path)
+    async with read_session_maker() as session:
+        repository = MessageRepository(session)
+        for label, filters in cases.items():
+            samples = []
+            page = []
+            with recorded_statements() as statements:
+                for _ in range(args.repeat):
+                    t0 = time.perf_counter()
+                    page = await repository.get_messages(READER, **filters, limit=args.limit, as_rows=True)
+                    samples.append(time.perf_counter() - t0)
+            # next page through the cursor
+            t0 = time.perf_counter()
+            if page:
+                await repository.get_messages(READER, **filters, after=page[-1]["id"], limit=args.limit, as_rows=True)
+            next_page = time.perf_counter() - t0
+
+            # the page query is the last statement get_messages ran
+            statement, parameters = statements[-1]
+            plan = " | ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters))
+            print(f"{label:>20}: median={statistics.median(samples) * 1000:7.2f}ms next_page={next_page * 1000:7.2f}ms rows={len(page)}  plan: {plan}")
+    conn.close()
+
+
+@contextmanager
+def recorded_statements():
+    """Collect the (SQL, parameters) of every statement run on the reader engine inside the block."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(read_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(read_engine.sync_engine, "before_cursor_execute", record)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--senders", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,52 @@
+"""CPU time to serialize one page of chat messages.
+
+Compares the response_model path (ORM objects validated into MessageOutput,
+then JSON-encoded) with the fast path (column tuples encoded directly by
+FastJSONResponse). No database is involved; rows are synthesized in memory.
+
+    python -m benchmarks.serialization --page 5000 --repeat 20
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from apps.message.models import Message
+from apps.message.schemas import MessageOutput
+from config import base  # noqa: F401  registers every mapper
+from responses import FastJSONResponse
+
+
+def measure(label, serialize, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        body = serialize()
+    per_page = (time.process_time() - started) / repeat * 1000
+    print(f"{label:>16}: {per_page:8.2f} ms CPU/page ({len(body)} bytes)")
+
+
+def run(page: int, repeat: int):
+    start = datetime(2024, 1, 1)
+    messages = [
+        Message(id=i, text=f"message number {i}", chat_id=1, sender_id="bench", time_delivered=start + timedelta(seconds=i))
+        for i in range(page)
+    ]
+    rows = [
+        {"text": m.text, "id": m.id, "receiver_id": m.receiver_id, "time_delivered": m.time_delivered, "chat_id": m.chat_id}
+        for m in messages
+    ]
+    adapter = TypeAdapter(list[MessageOutput])
+
+    measure("response_model", lambda: JSONResponse(jsonable_encoder(adapter.validate_python(messages, from_attributes=True))).body, repeat)
+    measure("fast path", lambda: FastJSONResponse(rows).body, repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.page, args.repeat)
@@ -0,0 +1,77 @@
+"""Throughput of per-message commits vs. the write-behind group commit.
+
+Runs CONCURRENCY concurrent senders writing MESSAGES messages in total into a
+fresh SQLite file database, once committing every message on its own session
+(what send_message does by default) and once through MessageWriter. Both
+paths update the chat summary with record_messages, as send_message does.
+
+    python -m benchmarks.write_behind --messages 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from apps.chat.models import Chat
+from apps.chat.summary import record_messages
+from apps.message.models import Message
+from apps.message.writer import MessageWriter
+from config.base import Base
+
+CHATS = 10
+
+
+async def per_message_commit(session_maker, values):
+    async with session_maker() as session:
+        message = Message(**values)
+        session.add(message)
+        await session.flush()
+        await record_messages(session, [message])
+        await session.commit()
+        await session.refresh(message)
+
+
+async def measure(label, send, messages, concurrency):
+    counter = iter(range(messages))
+
+    async def sender():
+        for i in counter:
+            await send({"text": f"message {i}", "chat_id": i % CHATS + 1, "sender_id": "bench"})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(sender() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:>20}: {messages / elapsed:8.0f} msg/s ({elapsed:.2f}s)")
+
+
+async def run(messages: int, concurrency: int, max_batch: int, max_latency_ms: float):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_maker() as session:
+            session.add_all([Chat(id=chat_id, name=f"chat {chat_id}", status=1) for chat_id in range(1, CHATS + 1)])
+            await session.commit()
+
+        await measure("per-message commit", lambda values: per_message_commit(session_maker, values), messages, concurrency)
+
+        writer = MessageWriter(session_maker, max_batch=max_batch, max_latency=max_latency_ms / 1000)
+        await measure("write-behind", writer.submit, messages, concurrency)
+        await writer.stop()
+        print(f"{'':>20}  {writer.batches} group commits, {writer.written / max(writer.batches, 1):.1f} msg/commit")
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--max-batch", type=int, default=500)
+    parser.add_argument("--max-latency-ms", type=float, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.concurrency, args.max_batch, args.max_latency_ms))
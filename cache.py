@@ -0,0 +1,135 @@
+from typing import Any, Awaitable, Callable, Hashable
+from fastapi import Request, Response
+from collections import OrderedDict
+from decouple import config as env
+import hashlib
+import time
+
+
+class CacheBackend:
+    """Storage used by ResponseCache; implement this to share cached responses between workers."""
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any):
+        raise NotImplementedError
+
+    def invalidate(self, key: Hashable):
+        raise NotImplementedError
+
+    def counter(self, key: Hashable) -> int:
+        """Current value of the counter at `key`; 0 if it was never incremented."""
+        raise NotImplementedError
+
+    def incr(self, key: Hashable) -> int:
+        """Atomically add one to the counter at `key` and return the new value."""
+        raise NotImplementedError
+
+
+class TTLCache(CacheBackend):
+    """Small in-process LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        # counters never expire or get evicted: losing one would revive what it invalidated
+        self._counters: dict[Hashable, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def counter(self, key: Hashable) -> int:
+        return self._counters.get(key, 0)
+
+    def incr(self, key: Hashable) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header covers `etag` (weak comparison, `*` matches anything)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """Serialized JSON responses keyed by namespace, invalidated per namespace.
+
+    Invalidating a namespace bumps its version, which is part of every key, so
+    all of its entries become unreachable at once and a response computed
+    while the invalidation happened is stored under the old, dead version.
+    The versions are counters in the backend, so a backend shared between
+    workers shares invalidations too.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def key(self, namespace: str, *parts) -> tuple:
+        return (namespace, self.backend.counter(("version", namespace)), *parts)
+
+    def invalidate(self, *namespaces: str):
+        for namespace in namespaces:
+            self.backend.incr(("version", namespace))
+
+    async def respond(self, request: Request, key: tuple, produce: Callable[[], Awaitable[bytes]]) -> Response:
+        """Serve `key` from the cache (or `produce` it), honouring If-None-Match."""
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+            body = await produce()
+            entry = (body, '"' + hashlib.sha1(body).hexdigest() + '"')
+            self.backend.set(key, entry)
+        else:
+            self.hits += 1
+
+        body, etag = entry
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(body, media_type="application/json", headers={"ETag": etag})
+
+    def metrics(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "not_modified": self.not_modified}
+
+
+response_cache = ResponseCache(TTLCache(
+    maxsize=env("RESPONSE_CACHE_SIZE", default=1024, cast=int),
+    ttl=env("RESPONSE_CACHE_TTL", default=60, cast=float),
+))
@@ -3,4 +3,5 @@ from .db import Base, DATABASE_URL
 #models
 from apps.chat.models import Chat, UserChat
 from apps.message.models import Message
+from apps.message.search import messages_fts
 from apps.user.auth import User
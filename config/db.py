@@ -1,12 +1,90 @@
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
+from decouple import config as env
+from sqlalchemy import event
 
-DATABASE_URL = "sqlite+aiosqlite:///./sql_app.db"
+from metrics import instrument_engine
 
-engine = create_async_engine(DATABASE_URL)
+DATABASE_URL = env("DATABASE_URL", default="sqlite+aiosqlite:///./sql_app.db")
+
+SQLITE_PRAGMAS = {
+    "journal_mode": env("SQLITE_JOURNAL_MODE", default="WAL"),
+    "synchronous": env("SQLITE_SYNCHRONOUS", default="NORMAL"),
+    "busy_timeout": env("SQLITE_BUSY_TIMEOUT_MS", default=5000, cast=int),
+    "mmap_size": env("SQLITE_MMAP_SIZE", default=268435456, cast=int),
+    # negative means KiB rather than pages
+    "cache_size": env("SQLITE_CACHE_SIZE", default=-65536, cast=int),
+    # off by default: deleting a user still leaves their messages and memberships behind
+    "foreign_keys": "ON" if env("SQLITE_FOREIGN_KEYS", default=False, cast=bool) else "OFF",
+}
+
+
+def apply_sqlite_pragmas(engine: AsyncEngine, read_only: bool = False):
+    """Run the SQLITE_PRAGMAS profile on every new connection of `engine`."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    pragmas = dict(SQLITE_PRAGMAS)
+    if read_only:
+        # the journal mode is a property of the file; the writer engine owns it
+        pragmas.pop("journal_mode")
+        pragmas["query_only"] = "ON"
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+engine = create_async_engine(
+    DATABASE_URL,
+    pool_size=env("DB_POOL_SIZE", default=5, cast=int),
+    max_overflow=env("DB_MAX_OVERFLOW", default=10, cast=int),
+)
+apply_sqlite_pragmas(engine)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
+read_engine = create_async_engine(
+    env("READ_DATABASE_URL", default=DATABASE_URL),
+    pool_size=env("READ_POOL_SIZE", default=8, cast=int),
+    max_overflow=env("READ_MAX_OVERFLOW", default=8, cast=int),
+)
+apply_sqlite_pragmas(read_engine, read_only=True)
+read_session_maker = async_sessionmaker(read_engine, expire_on_commit=False)
+
+
+pool_checkouts = {"writer": 0, "reader": 0}
+
+
+def _count_checkouts(engine: AsyncEngine, name: str):
+    @event.listens_for(engine.sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_checkouts[name] += 1
+
+
+_count_checkouts(engine, "writer")
+_count_checkouts(read_engine, "reader")
+instrument_engine(engine)
+instrument_engine(read_engine)
+
+
+def pool_metrics() -> dict:
+    """Connection usage of the writer and reader pools."""
+    metrics = {}
+    for name, pool_engine in (("writer", engine), ("reader", read_engine)):
+        pool = pool_engine.pool
+        metrics[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "checkouts_total": pool_checkouts[name],
+        }
+    return metrics
+
 
 class Base(DeclarativeBase):
     pass
@@ -22,3 +100,8 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    async with read_session_maker() as session:
+        yield session
+
+
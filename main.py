@@ -1,14 +1,32 @@
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
+from apps.message.retention import retention_job
+from apps.message.writer import message_writer
+from apps.realtime.broker import broker
+from apps.user.hashing import password_hasher
+from metrics import request_metrics_middleware
 from routes import routes
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await broker.start()
+    await retention_job.start()
+    yield
+    await retention_job.stop()
+    await message_writer.stop()
+    await broker.stop()
+    password_hasher.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 
 app.include_router(routes)
+app.middleware("http")(request_metrics_middleware)
 
 origins = [
     "http://localhost",
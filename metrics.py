@@ -0,0 +1,215 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.engine import CursorResult
+from contextvars import ContextVar
+from decouple import config as env
+from sqlalchemy import event
+import functools
+import inspect
+import logging
+import time
+
+slow_query_logger = logging.getLogger("sql.slow")
+
+SLOW_QUERY_MS = env("SLOW_QUERY_MS", default=200, cast=float)
+
+
+class RequestStats:
+    """What one request spent: wall time, time in the database, statements and rows."""
+
+    __slots__ = ("scope", "started", "db_time", "statements", "rows")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.statements = 0
+        self.rows = 0
+
+    @property
+    def route(self) -> str:
+        """Path template of the matched route, e.g. /chat/user_chats/{user_id}."""
+        route = self.scope.get("route")
+        if route is None:
+            return "unmatched"
+        # a route of an included router keeps its own path; the router's prefix
+        # is the part of the request path in front of the route's segments
+        prefix = self.scope["path"].split("/")[:-route.path.count("/")]
+        return "/".join(prefix) + route.path
+
+
+_request_stats: ContextVar[RequestStats|None] = ContextVar("request_stats", default=None)
+_repository_method: ContextVar[str|None] = ContextVar("repository_method", default=None)
+
+# (method, route, status) -> [requests, seconds, db seconds, statements, rows]
+_route_totals: dict[tuple[str, str, int], list] = {}
+
+
+class CountingFetchStrategy:
+    """Wraps a CursorResult's fetch strategy to charge the rows it hands out to a request.
+
+    Rows are counted as the result fetches them from the cursor, so ORM
+    entities, column tuples and streamed results are all counted the same way.
+    """
+
+    def __init__(self, strategy, stats: RequestStats):
+        self.strategy = strategy
+        self.stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self.strategy, name)
+
+    def fetchone(self, result, dbapi_cursor, hard_close=False):
+        row = self.strategy.fetchone(result, dbapi_cursor, hard_close)
+        if row is not None:
+            self.stats.rows += 1
+        return row
+
+    def fetchmany(self, result, dbapi_cursor, size=None):
+        rows = self.strategy.fetchmany(result, dbapi_cursor, size)
+        self.stats.rows += len(rows)
+        return rows
+
+    def fetchall(self, result, dbapi_cursor):
+        rows = self.strategy.fetchall(result, dbapi_cursor)
+        self.stats.rows += len(rows)
+        return rows
+
+    def yield_per(self, result, dbapi_cursor, num):
+        # yield_per swaps in a buffering strategy of its own; keep counting through it
+        self.strategy.yield_per(result, dbapi_cursor, num)
+        result.cursor_strategy = CountingFetchStrategy(result.cursor_strategy, self.stats)
+
+
+def instrument_engine(engine: AsyncEngine):
+    """Time every statement on `engine` and charge it, and the rows it returns or changes, to the current request."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.db_time += elapsed
+            stats.statements += 1
+            # statements returning rows are counted as they are fetched (see after_execute)
+            if cursor.description is None and cursor.rowcount > 0:
+                stats.rows += cursor.rowcount
+
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            slow_query_logger.warning(
+                "slow query %.1fms route=%s repository=%s: %s",
+                elapsed * 1000,
+                stats.route if stats is not None else None,
+                _repository_method.get(),
+                " ".join(statement.split())[:500],
+            )
+
+    @event.listens_for(engine.sync_engine, "after_execute")
+    def after_execute(conn, clauseelement, multiparams, params, execution_options, result):
+        stats = _request_stats.get()
+        if stats is not None and isinstance(result, CursorResult) and result.returns_rows:
+            result.cursor_strategy = CountingFetchStrategy(result.cursor_strategy, stats)
+
+
+def instrument_repository(cls):
+    """Class decorator recording which repository method issued each statement."""
+    for name, method in list(vars(cls).items()):
+        if name.startswith("__") or not inspect.iscoroutinefunction(method):
+            continue
+
+        def wrap(method, qualname=f"{cls.__name__}.{name}"):
+            @functools.wraps(method)
+            async def wrapper(*args, **kwargs):
+                token = _repository_method.set(qualname)
+                try:
+                    return await method(*args, **kwargs)
+                finally:
+                    _repository_method.reset(token)
+            return wrapper
+
+        setattr(cls, name, wrap(method))
+    return cls
+
+
+async def request_metrics_middleware(request: Request, call_next):
+    stats = RequestStats(request.scope)
+    token = _request_stats.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        _request_stats.reset(token)
+
+    elapsed = time.perf_counter() - stats.started
+    response.headers["Server-Timing"] = (
+        f'app;dur={elapsed * 1000:.2f}, db;dur={stats.db_time * 1000:.2f}, sql;desc="{stats.statements} statements, {stats.rows} rows"'
+    )
+
+    totals = _route_totals.setdefault((request.method, stats.route, response.status_code), [0, 0.0, 0.0, 0, 0])
+    totals[0] += 1
+    totals[1] += elapsed
+    totals[2] += stats.db_time
+    totals[3] += stats.statements
+    totals[4] += stats.rows
+    return response
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def render_metrics() -> str:
+    from apps.chat.membership import membership_cache
+    from apps.realtime.hub import hub
+    from apps.user.auth import principal_cache
+    from apps.user.hashing import password_hasher
+    from cache import response_cache
+    from config.db import pool_metrics
+    from ratelimit import rate_limits
+
+    lines = []
+
+    def metric(name: str, kind: str, samples: list[tuple[dict, float]]):
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{_labels(**labels)} {value}" for labels, value in samples)
+
+    routes = [({"method": method, "route": route, "status": status}, totals) for (method, route, status), totals in sorted(_route_totals.items())]
+    metric("http_requests_total", "counter", [(labels, totals[0]) for labels, totals in routes])
+    metric("http_request_duration_seconds_total", "counter", [(labels, totals[1]) for labels, totals in routes])
+    metric("db_time_seconds_total", "counter", [(labels, totals[2]) for labels, totals in routes])
+    metric("db_statements_total", "counter", [(labels, totals[3]) for labels, totals in routes])
+    metric("db_rows_total", "counter", [(labels, totals[4]) for labels, totals in routes])
+
+    pools = pool_metrics()
+    for field in ("size", "checked_out", "checked_in", "overflow"):
+        metric(f"db_pool_{field}", "gauge", [({"pool": pool}, values[field]) for pool, values in pools.items()])
+    metric("db_pool_checkouts_total", "counter", [({"pool": pool}, values["checkouts_total"]) for pool, values in pools.items()])
+
+    hasher = password_hasher.metrics()
+    metric("password_hash_queue_depth", "gauge", [({}, hasher["queue_depth"])])
+    metric("password_hash_total", "counter", [({}, hasher["hashes_total"])])
+    metric("password_hash_rejected_total", "counter", [({}, hasher["rejected_total"])])
+    metric("password_hash_seconds_total", "counter", [({}, hasher["latency_seconds_total"])])
+
+    caches = {"response": response_cache, "principal": principal_cache, "membership": membership_cache}
+    metric("cache_hits_total", "counter", [({"cache": name}, cache.hits) for name, cache in caches.items()])
+    metric("cache_misses_total", "counter", [({"cache": name}, cache.misses) for name, cache in caches.items()])
+    membership = membership_cache.metrics()
+    metric("membership_cache_chats", "gauge", [({}, membership["chats"])])
+    metric("membership_cache_members", "gauge", [({}, membership["members"])])
+    metric("ws_slow_consumers_dropped_total", "counter", [({}, hub.dropped_total)])
+    metric("rate_limited_total", "counter", [({"limit": name}, limit.limited) for name, limit in sorted(rate_limits.items())])
+
+    return "\n".join(lines) + "\n"
+
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
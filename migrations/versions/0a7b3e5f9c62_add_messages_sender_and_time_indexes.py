@@ -0,0 +1,28 @@
+"""Add messages sender and time indexes
+
+Revision ID: 0a7b3e5f9c62
+Revises: f2d6c1a8e309
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a7b3e5f9c62'
+down_revision: Union[str, None] = 'f2d6c1a8e309'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_messages_sender_id_time_delivered_id', 'messages', ['sender_id', 'time_delivered', 'id'], unique=False)
+    op.create_index('ix_messages_time_delivered_id', 'messages', ['time_delivered', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_time_delivered_id', table_name='messages')
+    op.drop_index('ix_messages_sender_id_time_delivered_id', table_name='messages')
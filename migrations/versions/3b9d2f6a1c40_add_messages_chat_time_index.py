@@ -0,0 +1,26 @@
+"""Add messages chat/time keyset index
+
+Revision ID: 3b9d2f6a1c40
+Revises: 1fc7ec0cc3db
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d2f6a1c40'
+down_revision: Union[str, None] = '1fc7ec0cc3db'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_messages_chat_id_time_delivered_id', 'messages', ['chat_id', 'time_delivered', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_chat_id_time_delivered_id', table_name='messages')
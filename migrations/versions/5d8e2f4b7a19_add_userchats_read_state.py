@@ -0,0 +1,36 @@
+"""Add userchats read state
+
+Revision ID: 5d8e2f4b7a19
+Revises: 0a7b3e5f9c62
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8e2f4b7a19'
+down_revision: Union[str, None] = '0a7b3e5f9c62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('userchats', sa.Column('last_delivered_message_id', sa.Integer(), nullable=True))
+    op.add_column('userchats', sa.Column('read_count', sa.Integer(), nullable=False, server_default='0'))
+    op.execute("""
+        UPDATE userchats SET read_count = (
+            SELECT count(*) FROM messages
+            WHERE messages.chat_id = userchats.chat_id AND messages.id <= userchats.last_read_message_id
+        )
+        WHERE last_read_message_id IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('userchats') as batch_op:
+        batch_op.drop_column('read_count')
+        batch_op.drop_column('last_delivered_message_id')
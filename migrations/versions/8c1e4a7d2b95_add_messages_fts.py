@@ -0,0 +1,63 @@
+"""Add messages full-text index
+
+Revision ID: 8c1e4a7d2b95
+Revises: 3b9d2f6a1c40
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1e4a7d2b95'
+down_revision: Union[str, None] = '3b9d2f6a1c40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH = 5000
+
+
+def upgrade() -> None:
+    op.execute("CREATE VIRTUAL TABLE messages_fts USING fts5(text, content='messages', content_rowid='id')")
+    op.execute("""CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, text) VALUES (new.id, new.text);
+    END""")
+    op.execute("""CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END""")
+    op.execute("""CREATE TRIGGER messages_fts_update AFTER UPDATE OF text ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO messages_fts(rowid, text) VALUES (new.id, new.text);
+    END""")
+
+    # rows inserted from here on are indexed by the trigger; backfill the ones before it
+    bind = op.get_bind()
+    upto = bind.execute(sa.text("SELECT max(id) FROM messages")).scalar()
+    if upto is None:
+        return
+
+    # each batch commits on its own so the write lock and the WAL stay bounded
+    with op.get_context().autocommit_block():
+        last_id = 0
+        while last_id < upto:
+            last_id_in_batch = bind.execute(
+                sa.text("SELECT max(id) FROM (SELECT id FROM messages WHERE id > :last_id AND id <= :upto ORDER BY id LIMIT :batch)"),
+                {"last_id": last_id, "upto": upto, "batch": BACKFILL_BATCH},
+            ).scalar()
+            if last_id_in_batch is None:
+                break
+            bind.execute(
+                sa.text("INSERT INTO messages_fts(rowid, text) SELECT id, text FROM messages WHERE id > :last_id AND id <= :upto"),
+                {"last_id": last_id, "upto": last_id_in_batch},
+            )
+            last_id = last_id_in_batch
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER messages_fts_update")
+    op.execute("DROP TRIGGER messages_fts_delete")
+    op.execute("DROP TRIGGER messages_fts_insert")
+    op.execute("DROP TABLE messages_fts")
@@ -0,0 +1,31 @@
+"""Add userchats unique membership
+
+Revision ID: 9b4c7d1e6f28
+Revises: 5d8e2f4b7a19
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b4c7d1e6f28'
+down_revision: Union[str, None] = '5d8e2f4b7a19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        DELETE FROM userchats WHERE id NOT IN (
+            SELECT min(id) FROM userchats GROUP BY chat_id, user_id
+        )
+    """)
+    op.create_index('uq_userchats_chat_id_user_id', 'userchats', ['chat_id', 'user_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('uq_userchats_chat_id_user_id', table_name='userchats')
@@ -0,0 +1,46 @@
+"""Add chat summary columns
+
+Revision ID: c47f0e9b3a12
+Revises: 8c1e4a7d2b95
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47f0e9b3a12'
+down_revision: Union[str, None] = '8c1e4a7d2b95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chats', sa.Column('last_message_id', sa.Integer(), nullable=True))
+    op.add_column('chats', sa.Column('last_message_at', sa.DateTime(), nullable=True))
+    op.add_column('chats', sa.Column('message_count', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index(op.f('ix_chats_last_message_at'), 'chats', ['last_message_at'], unique=False)
+    op.add_column('userchats', sa.Column('last_read_message_id', sa.Integer(), nullable=True))
+
+    op.execute("""
+        UPDATE chats SET
+            message_count = (SELECT count(*) FROM messages WHERE messages.chat_id = chats.id),
+            last_message_id = (SELECT max(id) FROM messages WHERE messages.chat_id = chats.id)
+    """)
+    op.execute("""
+        UPDATE chats SET last_message_at = (SELECT time_delivered FROM messages WHERE messages.id = chats.last_message_id)
+        WHERE last_message_id IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('userchats') as batch_op:
+        batch_op.drop_column('last_read_message_id')
+    op.drop_index(op.f('ix_chats_last_message_at'), table_name='chats')
+    with op.batch_alter_table('chats') as batch_op:
+        batch_op.drop_column('message_count')
+        batch_op.drop_column('last_message_at')
+        batch_op.drop_column('last_message_id')
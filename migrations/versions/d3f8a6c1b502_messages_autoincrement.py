@@ -0,0 +1,49 @@
+"""Never reuse message ids
+
+Revision ID: d3f8a6c1b502
+Revises: 9b4c7d1e6f28
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f8a6c1b502'
+down_revision: Union[str, None] = '9b4c7d1e6f28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FTS_TRIGGERS = (
+    """CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER messages_fts_update AFTER UPDATE OF text ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO messages_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+)
+
+
+def rebuild_messages(autoincrement: bool) -> None:
+    # without AUTOINCREMENT SQLite hands out max(id) + 1, so once retention
+    # archives the newest rows their ids would be given to new messages.
+    # Recreating the table drops its triggers; the FTS index itself is kept.
+    with op.batch_alter_table('messages', recreate='always', table_kwargs={'sqlite_autoincrement': autoincrement}):
+        pass
+    for trigger in FTS_TRIGGERS:
+        op.execute(trigger)
+
+
+def upgrade() -> None:
+    rebuild_messages(autoincrement=True)
+
+
+def downgrade() -> None:
+    rebuild_messages(autoincrement=False)
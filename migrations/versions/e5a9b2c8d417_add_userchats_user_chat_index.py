@@ -0,0 +1,26 @@
+"""Add userchats user/chat index
+
+Revision ID: e5a9b2c8d417
+Revises: c47f0e9b3a12
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a9b2c8d417'
+down_revision: Union[str, None] = 'c47f0e9b3a12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_userchats_user_id_chat_id', 'userchats', ['user_id', 'chat_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_userchats_user_id_chat_id', table_name='userchats')
@@ -0,0 +1,29 @@
+"""Add chat retention columns
+
+Revision ID: f2d6c1a8e309
+Revises: e5a9b2c8d417
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2d6c1a8e309'
+down_revision: Union[str, None] = 'e5a9b2c8d417'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('chats', sa.Column('retention_days', sa.Integer(), nullable=True))
+    op.add_column('chats', sa.Column('archived_until', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('chats') as batch_op:
+        batch_op.drop_column('archived_until')
+        batch_op.drop_column('retention_days')
@@ -0,0 +1,167 @@
+from typing import Awaitable, Callable, Hashable
+from fastapi import HTTPException, Request
+from collections import OrderedDict
+from decouple import config as env
+from jose import jwt, JWTError
+import math
+import time
+
+from apps.user.auth import ALGORITHM, SECRET
+
+UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_limit(limit: str) -> tuple[int, float]|None:
+    """"20/minute" -> (burst of 20, refilled at 20/60 tokens a second); "" disables the limit."""
+    if not limit:
+        return None
+    count, unit = limit.split("/")
+    period = UNITS[unit] if unit in UNITS else float(unit)
+    return int(count), int(count) / period
+
+
+class RateLimitBackend:
+    """Bucket storage used by RateLimit; implement this to share limits between workers."""
+
+    async def take(self, key: Hashable, capacity: int, rate: float, cost: int = 1) -> float:
+        """Take `cost` tokens from the bucket at `key`; returns 0 on success, else seconds until they are available."""
+        raise NotImplementedError
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Token buckets kept in-process, one float per bucket.
+
+    Each bucket is stored as the time at which it will be full again, which
+    determines how many tokens it has now. A bucket past that time is
+    indistinguishable from a new one, so it can be forgotten: buckets are
+    kept in least-recently-used order and the expired ones at the old end
+    are dropped as new ones are touched, and at most `maxsize` are kept.
+    """
+
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self._full_at: OrderedDict[Hashable, float] = OrderedDict()
+
+    async def take(self, key: Hashable, capacity: int, rate: float, cost: int = 1) -> float:
+        now = time.monotonic()
+        deficit = max(self._full_at.get(key, now) - now, 0.0)
+        tokens = capacity - deficit * rate
+        if tokens < cost:
+            return (cost - tokens) / rate
+
+        self._full_at[key] = now + deficit + cost / rate
+        self._full_at.move_to_end(key)
+        self._expire(now)
+        return 0.0
+
+    def _expire(self, now: float):
+        while self._full_at:
+            key, full_at = next(iter(self._full_at.items()))
+            if full_at > now and len(self._full_at) <= self.maxsize:
+                return
+            del self._full_at[key]
+
+    def __len__(self) -> int:
+        return len(self._full_at)
+
+
+def client_ip(request: Request) -> str:
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def token_subject(request: Request) -> str|None:
+    """The user id of the bearer token, without a database lookup; auth itself is checked by the route."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+
+async def login_username(request: Request) -> str|None:
+    return (await request.form()).get("username")
+
+
+class RateLimit:
+    """Route dependency enforcing a per-user and a per-IP token bucket.
+
+    `per_user` and `per_ip` are limits such as "20/minute" (see parse_limit);
+    either may be empty to skip it. `user_key` picks what counts as the user,
+    the bearer token's subject by default. Requests over a limit get a 429
+    with Retry-After. Used as a dependency a request costs one token; routes
+    doing several units of work at once call check() with their own cost.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        per_user: str = "",
+        per_ip: str = "",
+        user_key: Callable[[Request], Awaitable[str|None]] = token_subject,
+        backend: RateLimitBackend|None = None,
+    ):
+        self.name = name
+        self.per_user = parse_limit(per_user)
+        self.per_ip = parse_limit(per_ip)
+        self.user_key = user_key
+        self.backend = backend
+        self.limited = 0
+        rate_limits[name] = self
+
+    async def __call__(self, request: Request):
+        await self.check(request)
+
+    async def check(self, request: Request, cost: int = 1):
+        """Take `cost` tokens from each of the caller's buckets, or raise a 429."""
+        if not RATE_LIMIT_ENABLED:
+            return
+        backend = self.backend or rate_limit_backend
+
+        buckets = []
+        if self.per_ip is not None:
+            buckets.append((("ip", self.name, client_ip(request)), self.per_ip))
+        if self.per_user is not None:
+            user = await self.user_key(request)
+            if user is not None:
+                buckets.append((("user", self.name, user), self.per_user))
+
+        # a bucket never holds more than its capacity, so waiting would not help
+        if any(cost > capacity for _, (capacity, _) in buckets):
+            self.limited += 1
+            raise HTTPException(status_code=413, detail="Request is larger than the rate limit allows")
+
+        for key, (capacity, rate) in buckets:
+            retry_after = await backend.take(key, capacity, rate, cost)
+            if retry_after:
+                self.limited += 1
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests",
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+
+
+RATE_LIMIT_ENABLED = env("RATE_LIMIT_ENABLED", default=True, cast=bool)
+# only behind a proxy that sets the header; otherwise clients could pick their own bucket
+TRUST_FORWARDED_FOR = env("RATE_LIMIT_TRUST_FORWARDED_FOR", default=False, cast=bool)
+
+rate_limit_backend: RateLimitBackend = MemoryRateLimitBackend(maxsize=env("RATE_LIMIT_MAX_BUCKETS", default=100000, cast=int))
+rate_limits: dict[str, RateLimit] = {}
+
+send_message_limit = RateLimit(
+    "send_message",
+    per_user=env("RATE_LIMIT_SEND_MESSAGE_USER", default="120/minute"),
+    per_ip=env("RATE_LIMIT_SEND_MESSAGE_IP", default="600/minute"),
+)
+login_limit = RateLimit(
+    "login",
+    per_user=env("RATE_LIMIT_LOGIN_USER", default="10/minute"),
+    per_ip=env("RATE_LIMIT_LOGIN_IP", default="60/minute"),
+    user_key=login_username,
+)
@@ -2,49 +2,69 @@ from datetime import datetime
 from typing import Annotated
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import load_only, selectinload
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import select
+from sqlalchemy import delete, func, insert, literal, select, text, tuple_
 from fastapi import HTTPException, Depends
 from jose import jwt
-import bcrypt
+from apps.chat.membership import membership_cache
 from apps.chat.models import Chat, UserChat
+from apps.chat.summary import mark_delivered, mark_read, message_time, record_messages
 from apps.chat.schemas import ChatCreate
 from apps.message.models import Message
-from apps.message.schemas import MessageCreate
+from apps.message.schemas import MessageCreate, MessageOutput
+from apps.message.search import fts_query, messages_fts
+from apps.message.writer import message_writer
+from apps.message import archive
+from apps.realtime.broker import broker
+from apps.realtime.hub import hub
 
 from apps.user.schemas import UserCreate, UserRead
-from apps.user.auth import User, ALGORITHM, SECRET
-from config.db import get_async_session
+from apps.user.auth import User, ALGORITHM, SECRET, invalidate_principal
+from apps.user.hashing import password_hasher
+from config.db import get_async_session, get_read_session
+from cache import response_cache
+from metrics import instrument_repository
 
 
 
+# what each user lookup loads; pick the smallest profile the caller actually serializes
+USER_LOAD_PROFILES = {
+    "summary": (load_only(User.id, User.username, User.photo_url),),
+    "auth": (load_only(User.id, User.username, User.password),),
+    "with_chats": (selectinload(User.chats),),
+    "with_messages": (selectinload(User.messages),),
+}
+
+
+@instrument_repository
 class UserRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
     async def create_user(self, user: UserCreate) -> UserRead:
         try:
-            hashed_password = bcrypt.hashpw(user.password.encode('utf-8'), bcrypt.gensalt())
+            hashed_password = await password_hasher.hash(user.password)
 
             user_db = User(
                 username=user.username,
-                password=hashed_password.decode('utf-8'),
+                password=hashed_password,
                 photo_url=user.photo_url,
             )
 
             self.db.add(user_db)
             await self.db.commit()
             await self.db.refresh(user_db)
+            response_cache.invalidate("users")
 
             return UserRead.from_orm(user_db)
         except IntegrityError:
             raise HTTPException(status_code=400, detail="Username already in use")
 
     async def login_user(self, form_data: OAuth2PasswordRequestForm = Depends()) -> dict:
-        db_user = await self.get_user_by_username(form_data.username)
+        db_user = await self.get_user_by_username(form_data.username, load="auth")
 
-        if db_user is None or not bcrypt.checkpw(form_data.password.encode('utf-8'), db_user.password.encode('utf-8')):
+        if db_user is None or not await password_hasher.verify(form_data.password, db_user.password):
             raise HTTPException(status_code=400, detail="Incorrect username or password")
         
         user_dict = {
@@ -57,20 +77,36 @@ class UserRepository:
         return {"access_token": access_token, "token_type": "bearer"}
 
 
-    async def get_users(self) -> list[dict]:
-        query = select(User).options(selectinload(User.messages))
+    async def get_users(self, load: str = "summary") -> list[dict]:
+        query = select(User).options(*USER_LOAD_PROFILES[load])
         result = await self.db.execute(query)
         users = result.scalars().all()
         return users
 
-    async def get_user_by_id(self, user_id: str):
-        query = select(User).where(User.id == user_id).options(selectinload(User.messages))
+    async def search_users(self, prefix: str = "", after: str|None = None, limit: int = 20) -> list[User]:
+        """Username type-ahead, ordered by username and paged by the last username seen.
+
+        The prefix is matched as a range so SQLite can walk the unique index on
+        username instead of scanning the table (LIKE would not use it).
+        """
+        query = select(User).options(*USER_LOAD_PROFILES["summary"])
+
+        if prefix:
+            query = query.where(User.username >= prefix, User.username < prefix + "\U0010ffff")
+        if after is not None:
+            query = query.where(User.username > after)
+
+        result = await self.db.execute(query.order_by(User.username).limit(limit))
+        return result.scalars().all()
+
+    async def get_user_by_id(self, user_id: str, load: str = "summary"):
+        query = select(User).where(User.id == user_id).options(*USER_LOAD_PROFILES[load])
         result = await self.db.execute(query)
         user = result.scalars().one_or_none()
         return user
 
-    async def get_user_by_username(self, username: str):
-        query = select(User).where(User.username == username).options(selectinload(User.messages))
+    async def get_user_by_username(self, username: str, load: str = "summary"):
+        query = select(User).where(User.username == username).options(*USER_LOAD_PROFILES[load])
         result = await self.db.execute(query)
         user = result.scalars().one_or_none()
         return user
@@ -80,21 +116,26 @@ class UserRepository:
         if user:
             await self.db.delete(user)
             await self.db.commit()
+            invalidate_principal(user_id)
+            response_cache.invalidate("users", "chats")
 
     async def update_user(self, user_id: str, user_update: UserCreate) -> UserRead|None:
         user = await self.get_user_by_id(user_id)
         if user:
             user.username = user_update.username
-            user.password = user_update.password
+            user.password = await password_hasher.hash(user_update.password)
             user.photo_url = user_update.photo_url
             async with self.db.begin():
                 await self.db.commit()
                 await self.db.refresh(user)
+            invalidate_principal(user_id)
+            response_cache.invalidate("users", "chats")
             return UserRead.from_orm(user)
         return None
 
 
 
+@instrument_repository
 class ChatRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -104,20 +145,73 @@ class ChatRepository:
             chat = Chat()
             chat.name = chat_data.name
             chat.status = chat_data.status
+            chat.retention_days = chat_data.retention_days
             
-            users = await self.db.execute(select(User).where(User.id.in_(chat_data.users)))
-            users = users.scalars().all()
-            
-            chat.users = users
             self.db.add(chat)
+            await self.db.flush()
+            await self._insert_members(chat.id, chat_data.users)
             await self.db.commit()
-            await self.db.refresh(chat)
-            
-            return chat
+            membership_cache.invalidate(chat.id)
+            response_cache.invalidate("chats")
+
+            result = await self.db.execute(
+                select(Chat)
+                .where(Chat.id == chat.id)
+                .options(selectinload(Chat.users).options(*USER_LOAD_PROFILES["summary"]))
+                .execution_options(populate_existing=True)
+            )
+            return result.scalar_one()
         except Exception as e:
             await self.db.rollback()
             raise HTTPException(status_code=400, detail=str(e))
 
+    async def add_members(self, chat_id: int, user_ids: list[str], current_user_id: str) -> int:
+        """Add existing users to the chat in one INSERT ... SELECT; returns how many were new."""
+        await self._require_member(chat_id, current_user_id)
+
+        added = await self._insert_members(chat_id, user_ids)
+        await self.db.commit()
+        membership_cache.invalidate(chat_id)
+        response_cache.invalidate("chats")
+        return added
+
+    async def remove_members(self, chat_id: int, user_ids: list[str], current_user_id: str) -> int:
+        """Remove users from the chat in one DELETE; returns how many were members."""
+        await self._require_member(chat_id, current_user_id)
+
+        result = await self.db.execute(
+            delete(UserChat).where(UserChat.chat_id == chat_id, UserChat.user_id.in_(user_ids))
+        )
+        await self.db.commit()
+        membership_cache.invalidate(chat_id)
+        hub.drop_members(chat_id, user_ids)
+        response_cache.invalidate("chats")
+        return result.rowcount
+
+    async def _require_member(self, chat_id: int, user_id: str):
+        if await self.db.get(Chat, chat_id) is None:
+            raise HTTPException(status_code=404, detail="Chat not found")
+        if not await membership_cache.is_member(self.db, chat_id, user_id):
+            raise HTTPException(status_code=403, detail="Not a member of this chat")
+
+    async def _insert_members(self, chat_id: int, user_ids: list[str]) -> int:
+        # new members start with the existing history already counted as read;
+        # current members are skipped here, the unique index only backs that up
+        already_member = (
+            select(UserChat.id)
+            .where(UserChat.chat_id == chat_id, UserChat.user_id == User.id)
+            .exists()
+        )
+        members = (
+            select(literal(chat_id), User.id, Chat.message_count, Chat.last_message_id)
+            .select_from(User)
+            .join(Chat, Chat.id == chat_id)
+            .where(User.id.in_(set(user_ids)), ~already_member)
+        )
+        result = await self.db.execute(
+            insert(UserChat).from_select(["chat_id", "user_id", "read_count", "last_read_message_id"], members)
+        )
+        return result.rowcount
 
     async def get_user_chats(self, user_id: str):
         query = (
@@ -125,97 +219,364 @@ class ChatRepository:
             .join(UserChat)
             .join(User)
             .filter(User.id == user_id)
-            .options(selectinload(Chat.users))
+            .options(selectinload(Chat.users).options(*USER_LOAD_PROFILES["summary"]))
         )
         result = await self.db.execute(query)
         return result.scalars().all()
 
-    async def get_my_chats(self, current_user: User):
+    async def get_my_chats(self, current_user: User, status: int|None = None, limit: int = 100, offset: int = 0):
+        """Inbox of the user: every chat with its preview and unread count, newest activity first."""
         query = (
-            select(Chat)
-            .join(UserChat)
-            .join(User)
-            .filter(User.id == current_user.id)
-            .options(selectinload(Chat.users))
+            select(Chat, UserChat.last_read_message_id, Message.text, Chat.message_count - UserChat.read_count)
+            .join(UserChat, UserChat.chat_id == Chat.id)
+            .outerjoin(Message, Message.id == Chat.last_message_id)
+            .where(UserChat.user_id == current_user.id)
+            .order_by(Chat.last_message_at.desc(), Chat.id.desc())
+            .limit(limit)
+            .offset(offset)
+        )
+        if status is not None:
+            query = query.where(Chat.status == status)
+        rows = (await self.db.execute(query)).all()
+
+        partners = await self.get_partners([chat.id for chat, *_ in rows], current_user.id)
+        # a chat quiet for longer than its retention has its last message in the archive
+        archived = await archive.archived_texts(
+            [chat.last_message_id for chat, _, text, _ in rows if text is None and chat.last_message_id is not None]
         )
-        result = await self.db.execute(query)
-        chats = result.scalars().all()
-
-        chat_partners = []
-
-        for chat in chats:
-            partner_users = [user for user in chat.users if user.id != current_user.id]
-            chat_partners.append(
-                {
-                    "chat_id": chat.id,
-                    "chat_name": chat.name,
-                    "status": chat.status,
-                    "partners": [
-                        {"user_id": partner.id, "username": partner.username}
-                        for partner in partner_users
-                    ],
-                }
-            )
 
-        return chat_partners
+        return [
+            {
+                "chat_id": chat.id,
+                "chat_name": chat.name,
+                "status": chat.status,
+                "partners": partners.get(chat.id, []),
+                "last_message_id": chat.last_message_id,
+                "last_message_at": chat.last_message_at,
+                "last_message_text": last_message_text if last_message_text is not None else archived.get(chat.last_message_id),
+                "message_count": chat.message_count,
+                "last_read_message_id": last_read_message_id,
+                "unread_count": unread_messages,
+            }
+            for chat, last_read_message_id, last_message_text, unread_messages in rows
+        ]
+
+    async def mark_read(self, chat_id: int, user_id: str, message_id: int) -> UserChat:
+        delivered_at = await self._chat_message_time(chat_id, user_id, message_id)
+        membership = await mark_read(self.db, chat_id, user_id, message_id, delivered_at)
+        if membership is None:
+            raise HTTPException(status_code=403, detail="Not a member of this chat")
+        await self.db.commit()
+        return membership
+
+    async def mark_delivered(self, chat_id: int, user_id: str, message_id: int) -> UserChat:
+        await self._chat_message_time(chat_id, user_id, message_id)
+        membership = await mark_delivered(self.db, chat_id, user_id, message_id)
+        if membership is None:
+            raise HTTPException(status_code=403, detail="Not a member of this chat")
+        await self.db.commit()
+        return membership
+
+    async def _chat_message_time(self, chat_id: int, user_id: str, message_id: int) -> datetime:
+        # membership first, so outsiders cannot probe which message ids a chat has
+        if not await membership_cache.is_member(self.db, chat_id, user_id):
+            raise HTTPException(status_code=403, detail="Not a member of this chat")
+        delivered_at = await message_time(self.db, chat_id, message_id)
+        if delivered_at is None:
+            raise HTTPException(status_code=404, detail="Message not found in this chat")
+        return delivered_at
+
+    async def get_partners(self, chat_ids: list[int], exclude_user_id: str) -> dict[int, list[dict]]:
+        """Other members of each chat, fetched for all chats in one query (id and username only)."""
+        if not chat_ids:
+            return {}
+
+        result = await self.db.execute(
+            select(UserChat.chat_id, User.id, User.username)
+            .join(User, User.id == UserChat.user_id)
+            .where(UserChat.chat_id.in_(chat_ids), UserChat.user_id != exclude_user_id)
+        )
+        partners: dict[int, list[dict]] = {}
+        for chat_id, user_id, username in result.all():
+            partners.setdefault(chat_id, []).append({"user_id": user_id, "username": username})
+        return partners
 
-    async def get_all_chats(self):
-        query = select(Chat).options(selectinload(Chat.users))
+    async def get_all_chats(self, status: int|None = None, limit: int = 100, offset: int = 0):
+        query = (
+            select(Chat)
+            .options(selectinload(Chat.users).options(*USER_LOAD_PROFILES["summary"]))
+            .order_by(Chat.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        if status is not None:
+            query = query.where(Chat.status == status)
         result = await self.db.execute(query)
         return result.unique().scalars().all()
 
 
+# MessageOutput's fields, in its field order, for paths that skip the ORM and Pydantic
+MESSAGE_OUTPUT_COLUMNS = (Message.text, Message.id, Message.receiver_id, Message.time_delivered, Message.chat_id)
+
+
+@instrument_repository
 class MessageRepository:
     def __init__(self, db: AsyncSession):
         self.db = db
 
     async def get_messages(
-        self, sender_id: str = None, time_delivered: datetime = None
+        self,
+        current_user_id: str,
+        chat_ids: list[int]|None = None,
+        sender_ids: list[str]|None = None,
+        since: datetime|None = None,
+        until: datetime|None = None,
+        descending: bool = False,
+        after: int|None = None,
+        limit: int = 50,
+        as_rows: bool = False,
     ):
-        try:
-            query = select(Message)
-
-            if sender_id:
-                query = query.where(Message.sender_id == sender_id)
-            if time_delivered:
-                query = query.where(Message.time_delivered == time_delivered)
+        """Messages across chats filtered by chat, sender and a [since, until) time range.
 
-            messages = await self.db.execute(query)
-            messages_data = messages.scalars().all()
+        Ordered by (time_delivered, id) and paged by the id of the last message
+        of the previous page; the filters line up with the chat, sender and
+        time_delivered indexes so a page never scans the whole table. Only
+        chats of `current_user_id` are searched: asking for any other chat is
+        a 403, and without chat ids every chat the user is in is searched.
+        """
+        for chat_id in set(chat_ids or ()):
+            await self.require_member(chat_id, current_user_id)
 
-            return messages_data
+        try:
+            query = select(*MESSAGE_OUTPUT_COLUMNS) if as_rows else select(Message)
+            key = tuple_(Message.time_delivered, Message.id)
+
+            if chat_ids:
+                query = query.where(Message.chat_id.in_(chat_ids))
+            else:
+                query = query.where(Message.chat_id.in_(select(UserChat.chat_id).where(UserChat.user_id == current_user_id)))
+            if sender_ids:
+                query = query.where(Message.sender_id.in_(sender_ids))
+            if since is not None:
+                query = query.where(Message.time_delivered >= since)
+            if until is not None:
+                query = query.where(Message.time_delivered < until)
+            if after is not None:
+                cursor = tuple_(*await self._cursor_key(after))
+                query = query.where(key < cursor if descending else key > cursor)
+
+            if descending:
+                query = query.order_by(Message.time_delivered.desc(), Message.id.desc())
+            else:
+                query = query.order_by(Message.time_delivered, Message.id)
+
+            result = await self.db.execute(query.limit(limit))
+            return [row._asdict() for row in result] if as_rows else result.scalars().all()
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
 
+    async def require_member(self, chat_id: int, user_id: str):
+        if not await membership_cache.is_member(self.db, chat_id, user_id):
+            raise HTTPException(status_code=403, detail="Not a member of this chat")
+
     async def send_message(
         self, message_data: MessageCreate, current_user_id: str
     ):
+        await self.require_member(message_data.chat_id, current_user_id)
+
         try:
-            new_message = Message(
-                text=message_data.text,
-                sender_id=current_user_id,
-                chat_id=message_data.chat_id,
-            )
+            if message_writer.enabled:
+                new_message = await message_writer.submit({
+                    "text": message_data.text,
+                    "sender_id": current_user_id,
+                    "chat_id": message_data.chat_id,
+                })
+            else:
+                new_message = Message(
+                    text=message_data.text,
+                    sender_id=current_user_id,
+                    chat_id=message_data.chat_id,
+                )
+
+                self.db.add(new_message)
+                await self.db.flush()
+                await record_messages(self.db, [new_message])
+                await self.db.commit()
+                await self.db.refresh(new_message)
+        except Exception as e:
+            await self.db.rollback()
+            raise HTTPException(status_code=400, detail=str(e))
 
-            self.db.add(new_message)
-            await self.db.commit()
-            await self.db.refresh(new_message)
+        # the message is saved by now; a failed fan-out must not turn into a 400 the client retries
+        await broker.publish(new_message.chat_id, MessageOutput.model_validate(new_message).model_dump(mode="json"))
+        return new_message
+
+    async def send_messages(
+        self, messages_data: list[MessageCreate], current_user_id: str
+    ):
+        """Insert many messages in one transaction with a single INSERT ... RETURNING."""
+        chat_ids = {message.chat_id for message in messages_data}
+
+        forbidden = [
+            chat_id for chat_id in chat_ids
+            if not await membership_cache.is_member(self.db, chat_id, current_user_id)
+        ]
+        if forbidden:
+            raise HTTPException(status_code=403, detail=f"Not a member of chats {sorted(forbidden)}")
 
-            return new_message
+        try:
+            result = await self.db.scalars(
+                insert(Message).returning(Message, sort_by_parameter_order=True),
+                [
+                    {"text": message.text, "sender_id": current_user_id, "chat_id": message.chat_id}
+                    for message in messages_data
+                ],
+            )
+            new_messages = result.all()
+            await record_messages(self.db, new_messages)
+            await self.db.commit()
         except Exception as e:
             await self.db.rollback()
             raise HTTPException(status_code=400, detail=str(e))
 
+        for new_message in new_messages:
+            await broker.publish(new_message.chat_id, MessageOutput.model_validate(new_message).model_dump(mode="json"))
+
+        return new_messages
+
     async def get_messages_in_chat(
-        self, chat_id: int
+        self, chat_id: int, current_user_id: str, before: int|None = None, after: int|None = None, limit: int = 50, as_rows: bool = False
     ):
+        """Keyset page of a chat, oldest first.
+
+        `before`/`after` are message ids used as cursors; the page is walked
+        along the (chat_id, time_delivered, id) index, so the cost does not
+        depend on how many messages the chat already has. With `as_rows` the
+        page is returned as plain dicts of the MessageOutput columns instead
+        of ORM objects. Once a chat has archived messages, pages that run past
+        the oldest hot message continue into the archive. Only members of
+        the chat may read it.
+        """
+        await self.require_member(chat_id, current_user_id)
+
         try:
-            query = select(Message).where(Message.chat_id == chat_id)
-            result = await self.db.execute(query)
+            archived_until = await self.db.scalar(select(Chat.archived_until).where(Chat.id == chat_id))
+            if archived_until is None:
+                query = self._page_query(chat_id, as_rows)
+                key = tuple_(Message.time_delivered, Message.id)
+
+                if before is not None:
+                    query = query.where(key < tuple_(self._cursor_time(before), before))
+                if after is not None:
+                    query = query.where(key > tuple_(self._cursor_time(after), after))
+
+                ascending = after is not None and before is None
+                page = await self._hot_page(query, limit, ascending, as_rows)
+                return page if ascending else list(reversed(page))
+
+            return await self._tiered_page(chat_id, before, after, limit, as_rows)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def _tiered_page(self, chat_id: int, before: int|None, after: int|None, limit: int, as_rows: bool):
+        before_key = await self._cursor_key(before) if before is not None else None
+        after_key = await self._cursor_key(after) if after is not None else None
+        key = tuple_(Message.time_delivered, Message.id)
+
+        def item_key(item):
+            return (item["time_delivered"], item["id"]) if as_rows else (item.time_delivered, item.id)
+
+        def cold_items(messages):
+            return [archive.to_row(message) for message in messages] if as_rows else messages
+
+        if after is not None and before is None:
+            # archived messages are all older than hot ones, so walk the archive first
+            cold = cold_items(await archive.archived_page(chat_id, after_key=after_key, limit=limit, descending=False))
+            lower = item_key(cold[-1]) if cold else after_key
+            hot = []
+            if len(cold) < limit:
+                query = self._page_query(chat_id, as_rows).where(key > tuple_(*lower))
+                hot = await self._hot_page(query, limit - len(cold), True, as_rows)
+            return cold + hot
+
+        query = self._page_query(chat_id, as_rows)
+        if before_key is not None:
+            query = query.where(key < tuple_(*before_key))
+        if after_key is not None:
+            query = query.where(key > tuple_(*after_key))
+        page = await self._hot_page(query, limit, False, as_rows)
+
+        if len(page) < limit:
+            upper = item_key(page[-1]) if page else before_key
+            page += cold_items(await archive.archived_page(chat_id, before_key=upper, after_key=after_key, limit=limit - len(page)))
+        return list(reversed(page))
+
+    def _page_query(self, chat_id: int, as_rows: bool):
+        query = select(*MESSAGE_OUTPUT_COLUMNS) if as_rows else select(Message)
+        return query.where(Message.chat_id == chat_id)
+
+    async def _hot_page(self, query, limit: int, ascending: bool, as_rows: bool) -> list:
+        if ascending:
+            query = query.order_by(Message.time_delivered, Message.id)
+        else:
+            query = query.order_by(Message.time_delivered.desc(), Message.id.desc())
+        result = await self.db.execute(query.limit(limit))
+        return [row._asdict() for row in result] if as_rows else list(result.scalars().all())
+
+    async def _cursor_key(self, message_id: int) -> tuple:
+        time_delivered = await self.db.scalar(select(Message.time_delivered).where(Message.id == message_id))
+        if time_delivered is None:
+            time_delivered = await archive.archived_time(message_id)
+        return (time_delivered, message_id)
+
+    async def stream_messages_in_chat(self, chat_id: int, chunk_size: int = 1000):
+        """Yield the whole chat, oldest first, as lists of at most `chunk_size` row dicts.
+
+        Archived messages come first. Rows come from server-side cursors, so
+        memory use depends on the chunk size and not on the size of the chat.
+        """
+        query = (
+            select(*MESSAGE_OUTPUT_COLUMNS)
+            .where(Message.chat_id == chat_id)
+            .order_by(Message.time_delivered, Message.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        if await self.db.scalar(select(Chat.archived_until).where(Chat.id == chat_id)) is not None:
+            async for chunk in archive.stream_archived(chat_id, chunk_size):
+                yield chunk
+
+        result = await self.db.stream(query)
+        async for partition in result.partitions(chunk_size):
+            yield [row._asdict() for row in partition]
+
+
+    async def search_messages(
+        self, query_text: str, current_user_id: str, limit: int = 20, offset: int = 0
+    ):
+        """Best-ranked matches for `query_text` in the chats the user belongs to."""
+        match = fts_query(query_text)
+        if not match:
+            return []
+
+        query = (
+            select(Message)
+            .join(messages_fts, messages_fts.c.rowid == Message.id)
+            .where(text("messages_fts MATCH :match"))
+            .where(Message.chat_id.in_(select(UserChat.chat_id).where(UserChat.user_id == current_user_id)))
+            .order_by(func.bm25(text("messages_fts")))
+            .limit(limit)
+            .offset(offset)
+        )
+        try:
+            result = await self.db.execute(query, {"match": match})
             return result.scalars().all()
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
 
+    @staticmethod
+    def _cursor_time(message_id: int):
+        return select(Message.time_delivered).where(Message.id == message_id).scalar_subquery()
+
 
 async def get_message_repository(db: AsyncSession = Depends(get_async_session)):
     async with db:
@@ -229,3 +590,16 @@ async def get_chat_repository(db: AsyncSession = Depends(get_async_session)):
     async with db:
         yield ChatRepository(db)
 
+
+# read-only routes take these so they run on the reader pool instead of queueing behind writes
+async def get_message_read_repository(db: AsyncSession = Depends(get_read_session)):
+    async with db:
+        yield MessageRepository(db)
+
+async def get_user_read_repository(db: AsyncSession = Depends(get_read_session)):
+    async with db:
+        yield UserRepository(db)
+
+async def get_chat_read_repository(db: AsyncSession = Depends(get_read_session)):
+    async with db:
+        yield ChatRepository(db)
@@ -0,0 +1,35 @@
+from fastapi.responses import JSONResponse
+from decouple import config as env
+from typing import Any
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+FAST_JSON = env("FAST_JSON", default=True, cast=bool)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response for plain dicts/lists that skips response_model validation.
+
+    Encodes with orjson when it is installed (datetimes become ISO strings,
+    like Pydantic does) and falls back to the standard library otherwise.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _default(value: Any):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -3,10 +3,14 @@ from fastapi import APIRouter
 from apps.user.views import user_routes
 from apps.chat.views import chat_router
 from apps.message.views import message_router
+from apps.realtime.views import ws_router
+from metrics import metrics_router
 
 routes = APIRouter()
 
 
 routes.include_router(user_routes, prefix="/auth", tags=["users"])
 routes.include_router(chat_router, prefix="/chat", tags=["chats"])
-routes.include_router(message_router, prefix="/messages", tags=["messages"])
\ No newline at end of file
+routes.include_router(message_router, prefix="/messages", tags=["messages"])
+routes.include_router(ws_router, prefix="/ws", tags=["realtime"])
+routes.include_router(metrics_router, tags=["metrics"])
\ No newline at end of file
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import shutil
+import tempfile
+
+import pytest
+from alembic import command
+from alembic.config import Config
+
+# the suite gets its own database files; the engines read these at import time
+DIRECTORY = tempfile.mkdtemp(prefix="chat-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(DIRECTORY, 'test.db')}"
+os.environ["ARCHIVE_DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(DIRECTORY, 'archive.db')}"
+# every test sends from the same client, and test_send_batch sends 200 messages at once
+os.environ.setdefault("RATE_LIMIT_SEND_MESSAGE_USER", "1000/minute")
+os.environ.setdefault("RATE_LIMIT_SEND_MESSAGE_IP", "10000/minute")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config = Config(os.path.join(root, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(root, "migrations"))
+    command.upgrade(config, "head")
+    yield DIRECTORY
+    shutil.rmtree(DIRECTORY, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def run():
+    """Run coroutines to completion on one event loop shared by the session.
+
+    Several coroutines run concurrently and their results come back as a list.
+    """
+    loop = asyncio.new_event_loop()
+
+    def run(*coroutines, return_exceptions=False):
+        if len(coroutines) == 1 and not return_exceptions:
+            return loop.run_until_complete(coroutines[0])
+
+        async def gather():
+            return await asyncio.gather(*coroutines, return_exceptions=return_exceptions)
+        return loop.run_until_complete(gather())
+
+    yield run
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def register():
+    """Register and log in a user by name; returns (user id, auth headers)."""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+
+    def register(username):
+        user_id = client.post("/auth/register", json={"username": username, "password": "testpassword"}).json()["id"]
+        token = client.post("/auth/jwt/login", data={"username": username, "password": "testpassword"}).json()["access_token"]
+        return user_id, {"Authorization": f"Bearer {token}"}
+
+    return register
@@ -1,8 +1,32 @@
+from datetime import datetime, timedelta
+
 from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from apps.chat.summary import record_messages
+from apps.message.models import Message
+from apps.message.retention import RetentionJob
+from cache import ResponseCache, TTLCache, response_cache
+from config.db import async_session_maker, read_engine
 from main import app
 
 client = TestClient(app)
 
+
+def unread(chat_id, headers):
+    return next(c["unread_count"] for c in client.get("/chat/my_chats/1", headers=headers).json() if c["chat_id"] == chat_id)
+
+
+async def insert_messages(rows: list[dict]) -> list[Message]:
+    """Insert messages in one transaction the way the write-behind writer does."""
+    async with async_session_maker() as session:
+        messages = [Message(**row) for row in rows]
+        session.add_all(messages)
+        await session.flush()
+        await record_messages(session, messages)
+        await session.commit()
+        return messages
+
 def test_create_chat():
     # Создаем пользователя
     user_response = client.post("/auth/register", json={"username": "testuser", "password": "testpassword"})
@@ -56,4 +80,229 @@ def test_delete_user():
 
     # Попытка получения удаленного пользователя должна вернуть 404
     response = client.get("/auth/user/?username=testuser")
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_my_chats_summary():
+    response = client.post("/auth/register", json={"username": "inboxuser", "password": "testpassword"})
+    user_id = response.json()["id"]
+    login_response = client.post("/auth/jwt/login", data={"username": "inboxuser", "password": "testpassword"})
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    quiet = client.post("/chat/create_chat", json={"name": "Quiet", "status": 1, "users": [user_id]}).json()
+    busy = client.post("/chat/create_chat", json={"name": "Busy", "status": 1, "users": [user_id]}).json()
+    client.post("/messages/send_message", json={"text": "first", "chat_id": busy["id"]}, headers=headers)
+    client.post("/messages/send_message", json={"text": "second", "chat_id": busy["id"]}, headers=headers)
+
+    response = client.get("/chat/my_chats/1", headers=headers)
+    assert response.status_code == 200
+    chats = response.json()
+    assert [chat["chat_id"] for chat in chats] == [busy["id"], quiet["id"]]
+    assert chats[0]["last_message_text"] == "second"
+    assert chats[0]["message_count"] == 2
+    assert chats[0]["unread_count"] == 0
+    assert chats[1]["message_count"] == 0
+
+    response = client.get("/chat/my_chats/2", headers=headers)
+    assert response.json() == []
+
+    response = client.get("/chat/my_chats/1?limit=1&offset=1", headers=headers)
+    assert [chat["chat_id"] for chat in response.json()] == [quiet["id"]]
+
+    client.delete(f"/auth/user/?uuid={user_id}")
+
+
+def test_all_chats_etag_and_invalidation():
+    first = client.get("/chat/all_chats/1")
+    etag = first.headers["ETag"]
+    hits = response_cache.hits
+
+    response = client.get("/chat/all_chats/1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response_cache.hits == hits + 1
+
+    client.post("/chat/create_chat", json={"name": "Cache Chat", "status": 1, "users": []})
+    response = client.get("/chat/all_chats/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_all_chats_if_none_match_list():
+    etag = client.get("/chat/all_chats/1").headers["ETag"]
+
+    for header in (f'"stale", {etag}', f"W/{etag}", '"stale",W/' + etag, "*"):
+        response = client.get("/chat/all_chats/1", headers={"If-None-Match": header})
+        assert response.status_code == 304, header
+
+    response = client.get("/chat/all_chats/1", headers={"If-None-Match": '"stale", W/"other"'})
+    assert response.status_code == 200
+
+
+def test_response_cache_invalidation_shared_through_backend():
+    backend = TTLCache(maxsize=1)
+    worker_a, worker_b = ResponseCache(backend), ResponseCache(backend)
+
+    key = worker_a.key("chats", "all")
+    backend.set(key, (b"[]", '"etag"'))
+    assert worker_b.key("chats", "all") == key
+
+    worker_b.invalidate("chats")
+    assert worker_a.key("chats", "all") != key
+
+    # versions survive eviction of cached entries
+    backend.set(("other",), None)
+    backend.set(("another",), None)
+    assert worker_a.key("chats", "all") == worker_b.key("chats", "all") != key
+
+
+def test_read_watermarks(register):
+    users = {name: register(name) for name in ("reader_a", "reader_b")}
+
+    a_headers, b_headers = users["reader_a"][1], users["reader_b"][1]
+    chat = client.post("/chat/create_chat", json={"name": "Receipts", "status": 1, "users": [users["reader_a"][0], users["reader_b"][0]]}).json()
+    sent = client.post("/messages/send_batch", json=[{"text": f"m{i}", "chat_id": chat["id"]} for i in range(3)], headers=a_headers).json()
+
+    other = client.post("/chat/create_chat", json={"name": "Elsewhere", "status": 1, "users": [users["reader_a"][0]]}).json()
+    elsewhere = client.post("/messages/send_message", json={"text": "elsewhere", "chat_id": other["id"]}, headers=a_headers).json()
+
+    assert unread(chat["id"], a_headers) == 0
+    assert unread(chat["id"], b_headers) == 3
+
+    for message_id in (-5, elsewhere["id"]):
+        response = client.post(f"/chat/mark_read/{chat['id']}?message_id={message_id}", headers=b_headers)
+        assert response.status_code == 404
+        response = client.post(f"/chat/mark_delivered/{chat['id']}?message_id={message_id}", headers=b_headers)
+        assert response.status_code == 404
+    assert unread(chat["id"], b_headers) == 3
+
+    response = client.post(f"/chat/mark_read/{chat['id']}?message_id={sent[1]['id']}", headers=b_headers)
+    assert response.status_code == 200
+    assert response.json()["last_read_message_id"] == sent[1]["id"]
+    assert unread(chat["id"], b_headers) == 1
+
+    client.post(f"/chat/mark_read/{chat['id']}?message_id={sent[0]['id']}", headers=b_headers)
+    assert unread(chat["id"], b_headers) == 1
+
+    client.post(f"/chat/mark_read/{chat['id']}?message_id={sent[2]['id']}", headers=b_headers)
+    assert unread(chat["id"], b_headers) == 0
+
+    response = client.post(f"/chat/mark_read/0?message_id=1", headers=b_headers)
+    assert response.status_code == 403
+
+    for user_id, _ in users.values():
+        client.delete(f"/auth/user/?uuid={user_id}")
+
+
+
+def test_add_and_remove_members(register):
+    users = [register(f"member_{i}") for i in range(3)]
+    user_ids = [user_id for user_id, _ in users]
+    headers = users[0][1]
+    chat = client.post("/chat/create_chat", json={"name": "Members", "status": 1, "users": user_ids[:1]}).json()
+    assert [user["id"] for user in chat["users"]] == user_ids[:1]
+
+    response = client.post(f"/chat/add_members/{chat['id']}", json=user_ids[1:])
+    assert response.status_code == 401
+    response = client.post(f"/chat/add_members/{chat['id']}", json=user_ids[1:], headers=users[1][1])
+    assert response.status_code == 403
+
+    response = client.post(f"/chat/add_members/{chat['id']}", json=user_ids + ["no-such-user"], headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"added": 2}
+
+    response = client.get(f"/chat/user_chats/{user_ids[2]}")
+    assert chat["id"] in [c["id"] for c in response.json()]
+
+    response = client.post(f"/chat/remove_members/{chat['id']}", json=user_ids[1:])
+    assert response.status_code == 401
+    response = client.post(f"/chat/remove_members/{chat['id']}", json=user_ids[1:], headers=headers)
+    assert response.json() == {"removed": 2}
+
+    response = client.get(f"/chat/user_chats/{user_ids[2]}")
+    assert chat["id"] not in [c["id"] for c in response.json()]
+
+    # a removed member can no longer change the membership
+    response = client.post(f"/chat/add_members/{chat['id']}", json=user_ids[2:], headers=users[2][1])
+    assert response.status_code == 403
+
+    response = client.post("/chat/add_members/0", json=user_ids, headers=headers)
+    assert response.status_code == 404
+
+    for user_id in user_ids:
+        client.delete(f"/auth/user/?uuid={user_id}")
+
+
+def test_chat_lists_load_user_summaries_only():
+    user_id = client.post("/auth/register", json={"username": "summarized", "password": "testpassword"}).json()["id"]
+    client.post("/chat/create_chat", json={"name": "Summaries", "status": 1, "users": [user_id]})
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(read_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        for path in ("/chat/all_chats/1", f"/chat/user_chats/{user_id}"):
+            statements.clear()
+            response = client.get(path)
+            assert response.status_code == 200
+            assert any("users.username" in statement for statement in statements)
+            assert not any("users.password" in statement for statement in statements)
+    finally:
+        event.remove(read_engine.sync_engine, "before_cursor_execute", record)
+        client.delete(f"/auth/user/?uuid={user_id}")
+
+
+def test_batch_advances_every_senders_watermark(run, register):
+    (a_id, a_headers), (b_id, b_headers) = register("sender_a"), register("sender_b")
+    chat = client.post("/chat/create_chat", json={"name": "Two Senders", "status": 1, "users": [a_id, b_id]}).json()
+
+    run(insert_messages([
+        {"text": "from a", "chat_id": chat["id"], "sender_id": a_id},
+        {"text": "from b", "chat_id": chat["id"], "sender_id": b_id},
+        {"text": "from b again", "chat_id": chat["id"], "sender_id": b_id},
+    ]))
+
+    assert unread(chat["id"], a_headers) == 2
+    assert unread(chat["id"], b_headers) == 0
+
+    for user_id in (a_id, b_id):
+        client.delete(f"/auth/user/?uuid={user_id}")
+
+
+def test_my_chats_preview_survives_retention(run, register):
+    user_id, headers = register("quiet_member")
+    chat = client.post("/chat/create_chat", json={"name": "Quiet", "status": 1, "users": [user_id], "retention_days": 30}).json()
+
+    now = datetime.utcnow()
+    run(insert_messages([
+        {"text": text, "chat_id": chat["id"], "sender_id": "someone", "time_delivered": now - timedelta(days=days)}
+        for text, days in (("old first", 41), ("old last", 40))
+    ]))
+
+    def preview():
+        return next(c["last_message_text"] for c in client.get("/chat/my_chats/1", headers=headers).json() if c["chat_id"] == chat["id"])
+
+    assert preview() == "old last"
+    assert run(RetentionJob(async_session_maker, batch_size=10, pause=0).archive_chat(chat["id"], now - timedelta(days=30))) == 2
+    assert preview() == "old last"
+
+    client.delete(f"/auth/user/?uuid={user_id}")
+
+
+def test_mark_read_on_archived_message(run, register):
+    user_id, headers = register("archive_reader")
+    chat = client.post("/chat/create_chat", json={"name": "Old Reads", "status": 1, "users": [user_id], "retention_days": 30}).json()
+
+    now = datetime.utcnow()
+    messages = run(insert_messages([
+        {"text": f"message {i}", "chat_id": chat["id"], "sender_id": "someone", "time_delivered": now - timedelta(days=40 - 5 * i)}
+        for i in range(6)
+    ]))
+    assert run(RetentionJob(async_session_maker, batch_size=2, pause=0).archive_chat(chat["id"], now - timedelta(days=28))) == 3
+    assert unread(chat["id"], headers) == 6
+
+    response = client.post(f"/chat/mark_read/{chat['id']}?message_id={messages[1].id}", headers=headers)
+    assert response.status_code == 200
+    assert unread(chat["id"], headers) == 4
+
+    client.delete(f"/auth/user/?uuid={user_id}")
@@ -1,35 +1,160 @@
+from datetime import datetime, timedelta
+import asyncio
+import gzip
+import json
+import socket
+
 from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.websockets import WebSocketDisconnect
+import pytest
+
+from apps.chat.membership import MembershipCache
+from apps.message.models import Message
+from apps.message.retention import RetentionJob
+from apps.message.schemas import MessageOutput
+from apps.message.writer import MessageWriter
+from apps.realtime.broker import BrokerServer, SocketBroker, broker
+from apps.realtime.hub import ChatHub
+from config.base import Base
+from config.db import async_session_maker, read_session_maker
 from main import app
+from ratelimit import parse_limit, send_message_limit
+from repositories import MessageRepository
+from responses import FastJSONResponse
 
 client = TestClient(app)
 
+
+async def in_session(call, session_maker=async_session_maker):
+    """Await `call(session)` in a fresh session of `session_maker`."""
+    async with session_maker() as session:
+        return await call(session)
+
+
+async def seed_messages(messages: list[Message]):
+    async with async_session_maker() as session:
+        session.add_all(messages)
+        await session.commit()
+
+
+async def create_tables(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+def create_chat(name, user_ids, **fields):
+    return client.post("/chat/create_chat", json={"name": name, "status": 1, "users": user_ids, **fields}).json()
+
+
 def test_send_message():
     # Создаем пользователя
     response = client.post("/auth/register", json={"username": "testuser", "password": "testpassword"})
     assert response.status_code == 200
     assert response.json()["username"] == "testuser"
+    user_id = response.json()["id"]
 
     # Вход в систему
     login_response = client.post("/auth/jwt/login", data={"username": "testuser", "password": "testpassword"})
     assert login_response.status_code == 200
     access_token = login_response.json()["access_token"]
 
-    # Отправляем сообщение
+    # Отправляем сообщение в чужой чат
     message_data = {"text": "Hello, World!", "chat_id": 1}
     response = client.post("/messages/send_message", json=message_data, headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == 403
+
+    # Отправляем сообщение в свой чат
+    chat = create_chat("Sender Chat", [user_id])
+    message_data = {"text": "Hello, World!", "chat_id": chat["id"]}
+    response = client.post("/messages/send_message", json=message_data, headers={"Authorization": f"Bearer {access_token}"})
     assert response.status_code == 200
 
-def test_get_messages_in_chat():
-    # Получаем сообщения в чате
+def test_get_messages_in_chat(register):
+    # Без токена сообщения чата недоступны
     response = client.post("/messages/get_chat_messages?chat_id=0")  # Отправляем chat_id как параметр запроса
+    assert response.status_code == 401
+
+    user_id, headers = register("chatreader")
+    chat = create_chat("Reader Chat", [user_id])
+    response = client.post(f"/messages/get_chat_messages?chat_id={chat['id']}", headers=headers)
     assert response.status_code == 200
     assert len(response.json()) >= 0  # Проверьте, что получены сообщения в чате
 
-def test_get_messages():
-    # Получаем сообщения с фильтрами
-    response = client.get("/messages/messages?sender_id=test_sender_id&receiver_id=test_receiver_id&time_delivered=2023-09-01")
+    response = client.post("/messages/get_chat_messages?chat_id=1", headers=headers)
+    assert response.status_code == 403
+
+    client.delete(f"/auth/user/?uuid={user_id}")
+
+def test_get_messages(run, register):
+    # Без токена сообщения недоступны
+    response = client.get("/messages/messages?sender_id=test_sender_id")
+    assert response.status_code == 401
+
+    user_id, headers = register("filterer")
+    outsider_id, outsider_headers = register("outsider")
+    chat, other = create_chat("Filtered", [user_id]), create_chat("Elsewhere", [outsider_id])
+    day = datetime(2023, 9, 1)
+    messages = [
+        Message(text="first", chat_id=chat["id"], sender_id="test_sender_id", time_delivered=day + timedelta(hours=1)),
+        Message(text="second", chat_id=chat["id"], sender_id="test_sender_id", time_delivered=day + timedelta(hours=2)),
+        Message(text="next day", chat_id=chat["id"], sender_id="test_sender_id", time_delivered=day + timedelta(days=1)),
+        Message(text="not mine", chat_id=other["id"], sender_id="test_sender_id", time_delivered=day + timedelta(hours=3)),
+    ]
+    run(seed_messages(messages))
+    ids = [message.id for message in messages]
+
+    # Получаем сообщения с фильтрами: только из своих чатов
+    response = client.get("/messages/messages?sender_id=test_sender_id&since=2023-09-01T00:00:00&until=2023-09-02T00:00:00", headers=headers)
     assert response.status_code == 200
-    assert len(response.json()) >= 0  # Проверьте, что получены сообщения с фильтрами
+    assert [message["id"] for message in response.json()] == ids[:2]
+
+    response = client.get("/messages/messages?sender_id=test_sender_id&since=2023-09-01T00:00:00", headers=outsider_headers)
+    assert [message["id"] for message in response.json()] == ids[3:]
+
+    # Чужой чат в фильтре запрещен
+    response = client.get(f"/messages/messages?chat_id={chat['id']}&chat_id={other['id']}", headers=headers)
+    assert response.status_code == 403
+
+    client.delete(f"/auth/user/?uuid={user_id}")
+    client.delete(f"/auth/user/?uuid={outsider_id}")
+
+
+def test_get_messages_range_and_pagination(run, register):
+    user_id, headers = register("ranger")
+    chats = [create_chat(f"Range {i}", [user_id])["id"] for i in range(2)]
+    start = datetime(2021, 6, 1)
+    # the two chats take turns; the last two messages share a timestamp so the id breaks the tie
+    messages = [Message(text="too early", chat_id=chats[0], sender_id="ranger", time_delivered=start - timedelta(days=1))]
+    messages += [
+        Message(text=f"range {i}", chat_id=chats[i % 2], sender_id="ranger", time_delivered=start + timedelta(minutes=min(i, 4)))
+        for i in range(6)
+    ]
+    messages.append(Message(text="too late", chat_id=chats[1], sender_id="ranger", time_delivered=start + timedelta(hours=1)))
+    run(seed_messages(messages))
+    early, *ids, late = [message.id for message in messages]
+
+    def page(query, **cursor):
+        query += "".join(f"&{key}={value}" for key, value in cursor.items())
+        response = client.get(f"/messages/messages?{query}", headers=headers)
+        assert response.status_code == 200
+        return [message["id"] for message in response.json()]
+
+    both = f"chat_id={chats[0]}&chat_id={chats[1]}&since={start.isoformat()}&until={(start + timedelta(minutes=30)).isoformat()}&limit=3"
+    assert page(both) == ids[:3]
+    assert page(both, after=ids[2]) == ids[3:]
+    assert page(both, after=ids[5]) == []
+
+    newest = f"chat_id={chats[0]}&order=desc&limit=2"
+    assert page(newest) == [ids[4], ids[2]]
+    assert page(newest, after=ids[2]) == [ids[0], early]
+    assert page(newest, after=early) == []
+
+    assert page(f"chat_id={chats[1]}&since={start.isoformat()}") == [ids[1], ids[3], ids[5], late]
+
+    client.delete(f"/auth/user/?uuid={user_id}")
 
 
 def test_delete_user():
@@ -41,4 +166,395 @@ def test_delete_user():
 
     # Попытка получения удаленного пользователя должна вернуть 404
     response = client.get("/auth/user/?username=testuser")
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+def test_get_messages_in_chat_paginated(register):
+    user_id, headers = register("pager")
+    chat = create_chat("Pager Chat", [user_id])
+    response = client.post("/messages/send_batch", json=[{"text": f"page {i}", "chat_id": chat["id"]} for i in range(5)], headers=headers)
+    ids = [message["id"] for message in response.json()]
+    assert ids == sorted(ids)
+
+    def page(**cursor):
+        query = "".join(f"&{key}={value}" for key, value in cursor.items())
+        response = client.post(f"/messages/get_chat_messages?chat_id={chat['id']}&limit=2{query}", headers=headers)
+        assert response.status_code == 200
+        return [message["id"] for message in response.json()]
+
+    # назад от последних сообщений
+    assert page() == ids[3:]
+    assert page(before=ids[3]) == ids[1:3]
+    assert page(before=ids[1]) == ids[:1]
+    assert page(before=ids[0]) == []
+
+    # вперед от прочитанного сообщения
+    assert page(after=ids[0]) == ids[1:3]
+    assert page(after=ids[2]) == ids[3:]
+    assert page(after=ids[4]) == []
+
+    client.delete(f"/auth/user/?uuid={user_id}")
+
+
+def test_websocket_receives_sent_message():
+    with TestClient(app) as ws_client:
+        user_id = ws_client.post("/auth/register", json={"username": "wsuser", "password": "testpassword"}).json()["id"]
+        login_response = ws_client.post("/auth/jwt/login", data={"username": "wsuser", "password": "testpassword"})
+        access_token = login_response.json()["access_token"]
+        chat = ws_client.post("/chat/create_chat", json={"name": "Socket Chat", "status": 1, "users": [user_id]}).json()
+
+        with pytest.raises(WebSocketDisconnect):
+            with ws_client.websocket_connect(f"/ws/chats/0?token={access_token}") as websocket:
+                websocket.receive_json()
+
+        with ws_client.websocket_connect(f"/ws/chats/{chat['id']}?token={access_token}") as websocket:
+            response = ws_client.post(
+                "/messages/send_message",
+                json={"text": "pushed", "chat_id": chat["id"]},
+                headers={"Authorization": f"Bearer {access_token}"},
+            )
+            assert response.status_code == 200
+            assert websocket.receive_json()["id"] == response.json()["id"]
+
+        ws_client.delete("/auth/user/?username=wsuser")
+
+
+def test_websocket_closed_for_removed_member(register):
+    (a_id, a_headers), (b_id, b_headers) = register("ws_owner"), register("ws_removed")
+    with TestClient(app) as ws_client:
+        chat = create_chat("Leaving Chat", [a_id, b_id])
+        token = b_headers["Authorization"].split()[1]
+
+        with ws_client.websocket_connect(f"/ws/chats/{chat['id']}?token={token}") as websocket:
+            response = ws_client.post(f"/chat/remove_members/{chat['id']}", json=[b_id], headers=a_headers)
+            assert response.json() == {"removed": 1}
+            ws_client.post("/messages/send_message", json={"text": "secret after removal", "chat_id": chat["id"]}, headers=a_headers)
+
+            with pytest.raises(WebSocketDisconnect) as closed:
+                websocket.receive_json()
+            assert closed.value.code == 1008
+
+    client.delete(f"/auth/user/?uuid={a_id}")
+    client.delete(f"/auth/user/?uuid={b_id}")
+
+
+def test_hub_drops_slow_subscriber():
+    chat_hub = ChatHub(max_queue=2)
+    subscription = chat_hub.subscribe(7)
+    for i in range(3):
+        chat_hub.publish(7, {"id": i})
+
+    assert subscription.dropped
+    assert chat_hub.subscriber_count(7) == 0
+    assert subscription.queue.get_nowait() is None
+
+
+def test_socket_broker_delivers_across_workers_in_order(run):
+    server = BrokerServer("127.0.0.1", 0)
+    run(server.start())
+    sender = SocketBroker(ChatHub(), port=server.port, embed_server=False)
+    receiver = SocketBroker(ChatHub(), port=server.port, embed_server=False)
+    run(sender.start(), receiver.start())
+
+    subscription = receiver.hub.subscribe(1)
+    for i in range(5):
+        run(sender.publish(1, {"id": i}))
+    received = [run(asyncio.wait_for(subscription.get(), 2))["id"] for _ in range(5)]
+
+    run(sender.stop(), receiver.stop())
+    run(server.stop())
+    assert received == [0, 1, 2, 3, 4]
+
+
+def test_broker_server_cuts_off_slow_client_and_skips_bad_frames(run):
+    server = BrokerServer("127.0.0.1", 0, max_queue=8)
+    run(server.start())
+    sender = SocketBroker(ChatHub(), port=server.port, embed_server=False)
+    receiver = SocketBroker(ChatHub(), port=server.port, embed_server=False)
+    run(sender.start(), receiver.start())
+    subscription = receiver.hub.subscribe(1)
+
+    # connects but never reads
+    slow = socket.socket()
+    slow.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    slow.connect(("127.0.0.1", server.port))
+    _, slow_writer = run(asyncio.open_connection(sock=slow))
+
+    slow_writer.write(b"not json\n" + b'{"chat_id": 1}\n')
+    run(slow_writer.drain())
+
+    blob = "x" * 16384
+    for i in range(2000):
+        run(sender.publish(1, {"id": i, "blob": blob}))
+        assert run(asyncio.wait_for(subscription.get(), 2))["id"] == i
+        if server.dropped_total:
+            break
+
+    assert server.dropped_total == 1
+    run(sender.publish(1, {"id": "after"}))
+    assert run(asyncio.wait_for(subscription.get(), 2))["id"] == "after"
+
+    slow_writer.close()
+    run(sender.stop(), receiver.stop())
+    run(server.stop())
+
+
+def test_socket_broker_delivers_locally_without_relay(run):
+    # a port nothing listens on
+    probe = socket.socket()
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+
+    relay_client = SocketBroker(ChatHub(), port=port, embed_server=False)
+    run(relay_client.start())
+    subscription = relay_client.hub.subscribe(1)
+    run(relay_client.publish(1, {"id": "offline"}))
+    assert subscription.queue.get_nowait() == {"id": "offline"}
+    run(relay_client.stop())
+
+
+def test_socket_broker_falls_back_when_relay_drops(run):
+    class DroppedWriter:
+        def write(self, data):
+            pass
+
+        async def drain(self):
+            raise ConnectionResetError("relay went away")
+
+        def close(self):
+            pass
+
+    server = BrokerServer("127.0.0.1", 0)
+    run(server.start())
+    relay_client = SocketBroker(ChatHub(), port=server.port, embed_server=False)
+    run(relay_client.start())
+    subscription = relay_client.hub.subscribe(1)
+
+    relay_client._writer = DroppedWriter()
+    run(relay_client.publish(1, {"id": "dropped"}))
+    assert subscription.queue.get_nowait() == {"id": "dropped"}
+
+    run(relay_client.stop())
+    run(server.stop())
+
+
+def test_send_message_saved_when_fan_out_fails(register, monkeypatch):
+    user_id, headers = register("fanout")
+    chat = create_chat("Fan-out", [user_id])
+
+    async def publish(chat_id, payload):
+        raise RuntimeError("fan-out failed")
+    monkeypatch.setattr(broker, "publish", publish)
+
+    with pytest.raises(RuntimeError):
+        client.post("/messages/send_message", json={"text": "saved anyway", "chat_id": chat["id"]}, headers=headers)
+    monkeypatch.undo()
+
+    response = client.post(f"/messages/get_chat_messages?chat_id={chat['id']}", headers=headers)
+    assert [message["text"] for message in response.json()] == ["saved anyway"]
+
+    client.delete(f"/auth/user/?uuid={user_id}")
+
+
+def test_send_batch():
+    response = client.post("/auth/register", json={"username": "batchuser", "password": "testpassword"})
+    user_id = response.json()["id"]
+    login_response = client.post("/auth/jwt/login", data={"username": "batchuser", "password": "testpassword"})
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    chat = client.post("/chat/create_chat", json={"name": "Batch Chat", "status": 1, "users": [user_id]}).json()
+
+    batch = [{"text": f"message {i}", "chat_id": chat["id"]} for i in range(200)]
+    response = client.post("/messages/send_batch", json=batch, headers=headers)
+    assert response.status_code == 200
+    assert [message["text"] for message in response.json()] == [f"message {i}" for i in range(200)]
+    ids = [message["id"] for message in response.json()]
+    assert ids == sorted(ids)
+
+    response = client.post("/messages/send_batch", json=[{"text": "nope", "chat_id": 0}], headers=headers)
+    assert response.status_code == 403
+
+    client.delete(f"/auth/user/?uuid={user_id}")
+
+
+def test_message_writer_group_commits(run, tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'writer.db'}")
+    run(create_tables(engine))
+    writer = MessageWriter(async_sessionmaker(engine, expire_on_commit=False), max_batch=10, max_latency=0.05)
+
+    messages = run(*(writer.submit({"text": f"message {i}", "chat_id": 1, "sender_id": "writer"}) for i in range(5)))
+    run(writer.stop())
+    run(engine.dispose())
+
+    assert writer.batches == 1
+    assert [message.text for message in messages] == [f"message {i}" for i in range(5)]
+    assert [message.id for message in messages] == sorted({message.id for message in messages})
+
+
+def test_message_writer_isolates_failing_row(run, tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'writer.db'}")
+    run(create_tables(engine))
+    writer = MessageWriter(async_sessionmaker(engine, expire_on_commit=False), max_batch=10, max_latency=0.05)
+
+    rows = [{"text": f"message {i}", "chat_id": 1, "sender_id": "writer"} for i in range(4)]
+    rows[2]["time_delivered"] = "not a datetime"
+    results = run(*(writer.submit(values) for values in rows), return_exceptions=True)
+    run(writer.stop())
+    run(engine.dispose())
+
+    assert isinstance(results[2], Exception)
+    assert [message.text for i, message in enumerate(results) if i != 2] == ["message 0", "message 1", "message 3"]
+
+
+def test_sqlite_engine_profile(run):
+    def pragma(name, session_maker=async_session_maker):
+        return run(in_session(lambda session: session.scalar(text(f"PRAGMA {name}")), session_maker))
+
+    assert pragma("journal_mode") == "wal"
+    assert pragma("busy_timeout") == 5000
+    assert pragma("query_only", read_session_maker) == 1
+
+
+def test_send_batch_rate_limited(register, monkeypatch):
+    monkeypatch.setattr(send_message_limit, "per_user", parse_limit("5/minute"))
+    user_id, headers = register("batcher")
+    chat = create_chat("Batched", [user_id])
+
+    def send(count):
+        return client.post("/messages/send_batch", json=[{"text": f"batch {i}", "chat_id": chat["id"]} for i in range(count)], headers=headers)
+
+    assert send(3).status_code == 200
+    response = send(3)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert send(2).status_code == 200
+
+    # batches and single messages share the quota
+    response = client.post("/messages/send_message", json={"text": "one more", "chat_id": chat["id"]}, headers=headers)
+    assert response.status_code == 429
+    assert send(6).status_code == 413
+
+    client.delete(f"/auth/user/?uuid={user_id}")
+
+
+def test_search_messages():
+    response = client.post("/auth/register", json={"username": "searcher", "password": "testpassword"})
+    user_id = response.json()["id"]
+    login_response = client.post("/auth/jwt/login", data={"username": "searcher", "password": "testpassword"})
+    headers = {"Authorization": f"Bearer {login_response.json()['access_token']}"}
+
+    chat = client.post("/chat/create_chat", json={"name": "Search Chat", "status": 1, "users": [user_id]}).json()
+    client.post("/messages/send_batch", json=[
+        {"text": "the quick brown fox", "chat_id": chat["id"]},
+        {"text": "lazy dog", "chat_id": chat["id"]},
+    ], headers=headers)
+    client.post("/messages/send_message", json={"text": "quick but elsewhere", "chat_id": 1}, headers=headers)
+
+    response = client.get("/messages/search?q=quick", headers=headers)
+    assert response.status_code == 200
+    assert [message["text"] for message in response.json()] == ["the quick brown fox"]
+
+    response = client.get('/messages/search?q="unbalanced', headers=headers)
+    assert response.status_code == 200
+
+    client.delete(f"/auth/user/?uuid={user_id}")
+
+
+def test_fast_json_matches_response_model(run, register):
+    user_id, headers = register("fastjson")
+    chat = create_chat("Fast JSON", [user_id])
+    client.post("/messages/send_batch", json=[{"text": f"fast {i}", "chat_id": chat["id"]} for i in range(3)], headers=headers)
+
+    def page(**kwargs):
+        return run(in_session(lambda session: MessageRepository(session).get_messages_in_chat(chat["id"], user_id, limit=10, **kwargs), read_session_maker))
+
+    rows, messages = page(as_rows=True), page()
+    expected = TypeAdapter(list[MessageOutput]).dump_python(messages, mode="json")
+    assert len(expected) == 3
+    assert json.loads(FastJSONResponse(rows).body) == expected
+
+    client.delete(f"/auth/user/?uuid={user_id}")
+
+
+def test_export_chat_ndjson(register):
+    response = client.get("/messages/export/1")
+    assert response.status_code == 401
+
+    user_id, headers = register("exporter")
+    chat = create_chat("Exported", [user_id])
+    client.post("/messages/send_batch", json=[{"text": f"export {i}", "chat_id": chat["id"]} for i in range(10)], headers=headers)
+    response = client.get(f"/messages/export/{chat['id']}?chunk_size=7", headers=headers)
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [message["text"] for message in lines] == [f"export {i}" for i in range(10)]
+
+    response = client.get(f"/messages/export/{chat['id']}?gzip=true", headers={"Accept-Encoding": "identity", **headers})
+    assert response.status_code == 200
+    assert len(gzip.decompress(response.content).splitlines()) == len(lines)
+
+    client.delete(f"/auth/user/?uuid={user_id}")
+
+
+def test_retention_moves_old_messages_to_archive(run, register):
+    user_id, headers = register("archivist")
+    chat = create_chat("Retained", [user_id], retention_days=30)
+
+    now = datetime.utcnow()
+    run(seed_messages([
+        Message(text=f"message {i}", chat_id=chat["id"], sender_id="retention", time_delivered=now - timedelta(days=40 - i))
+        for i in range(20)
+    ]))
+    job = RetentionJob(async_session_maker, batch_size=4, pause=0)
+    assert run(job.archive_chat(chat["id"], now - timedelta(days=30, hours=12))) == 10
+
+    texts = []
+    response = client.post(f"/messages/get_chat_messages?chat_id={chat['id']}&limit=6", headers=headers)
+    while response.json():
+        texts = [message["text"] for message in response.json()] + texts
+        response = client.post(f"/messages/get_chat_messages?chat_id={chat['id']}&limit=6&before={response.json()[0]['id']}", headers=headers)
+    assert texts == [f"message {i}" for i in range(20)]
+
+    oldest = client.post(f"/messages/get_chat_messages?chat_id={chat['id']}&limit=20", headers=headers).json()[0]
+    response = client.post(f"/messages/get_chat_messages?chat_id={chat['id']}&limit=15&after={oldest['id']}", headers=headers)
+    assert [message["text"] for message in response.json()] == [f"message {i}" for i in range(1, 16)]
+
+    exported = client.get(f"/messages/export/{chat['id']}", headers=headers).text.splitlines()
+    assert len(exported) == 20
+
+    client.delete(f"/auth/user/?uuid={user_id}")
+
+
+def test_archived_message_ids_not_reused(run):
+    chat = create_chat("Reused Ids", [])
+    newest = Message(text="archived", chat_id=chat["id"], sender_id="retention", time_delivered=datetime.utcnow() - timedelta(days=1))
+    run(seed_messages([newest]))
+    assert run(RetentionJob(async_session_maker, batch_size=4, pause=0).archive_chat(chat["id"], datetime.utcnow())) == 1
+
+    message = Message(text="fresh", chat_id=chat["id"], sender_id="retention")
+    run(seed_messages([message]))
+    assert message.id > newest.id
+
+
+def test_membership_cache(run, register):
+    user_ids = [register(f"cached_{i}")[0] for i in range(3)]
+    chat = create_chat("Members Only", user_ids)
+    membership = MembershipCache(max_members=5, compact_above=2)
+
+    def check(chat_id, user_id):
+        return run(in_session(lambda session: membership.is_member(session, chat_id, user_id), read_session_maker))
+
+    assert check(chat["id"], user_ids[0])
+    assert check(chat["id"], user_ids[2])
+    assert not check(chat["id"], "stranger")
+    assert (membership.hits, membership.misses) == (2, 1)
+    assert isinstance(membership._data[chat["id"]][1], tuple)
+
+    check(0, "stranger")
+    check(1, "stranger")
+    assert membership.metrics()["members"] <= 5
+
+    membership.invalidate(chat["id"])
+    assert chat["id"] not in membership._data
+
+    for user_id in user_ids:
+        client.delete(f"/auth/user/?uuid={user_id}")
@@ -1,8 +1,33 @@
+from types import SimpleNamespace
+import time
+
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
+from sqlalchemy import delete, event
+
+from apps.message.models import Message
+from apps.user.auth import principal_cache
+from apps.user.hashing import PasswordHasher
+from config.db import async_session_maker, pool_metrics, read_engine
 from main import app
+from metrics import RequestStats
+from ratelimit import MemoryRateLimitBackend
 
 client = TestClient(app)
 
+
+async def seed_messages(messages: list[Message]):
+    async with async_session_maker() as session:
+        session.add_all(messages)
+        await session.commit()
+
+
+async def delete_messages(sender_id: str):
+    async with async_session_maker() as session:
+        await session.execute(delete(Message).where(Message.sender_id == sender_id))
+        await session.commit()
+
+
 def test_register_user():
     # Отправить POST-запрос для регистрации пользователя
     response = client.post("/auth/register", json={"username": "testuser", "password": "testpassword"})
@@ -41,4 +66,154 @@ def test_delete_user():
 
     # Попытка получения удаленного пользователя должна вернуть 404
     response = client.get("/auth/user/?username=testuser")
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+
+def test_password_hasher_backpressure(run):
+    hasher = PasswordHasher(rounds=4, max_workers=1, max_queue=0)
+
+    results = run(hasher.hash("a"), hasher.hash("b"), return_exceptions=True)
+    hasher.shutdown()
+
+    assert any(isinstance(r, HTTPException) and r.status_code == 503 for r in results)
+    assert any(isinstance(r, str) for r in results)
+    assert hasher.metrics()["rejected_total"] == 1
+
+
+def test_principal_cache_invalidated_on_delete():
+    response = client.post("/auth/register", json={"username": "cacheduser", "password": "testpassword"})
+    assert response.status_code == 200
+    user_id = response.json()["id"]
+
+    login_response = client.post("/auth/jwt/login", data={"username": "cacheduser", "password": "testpassword"})
+    access_token = login_response.json()["access_token"]
+
+    response = client.get("/chat/my_chats/1", headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == 200
+    assert principal_cache.get(user_id) is not None
+
+    response = client.delete(f"/auth/user/?uuid={user_id}")
+    assert response.status_code == 200
+    assert principal_cache.get(user_id) is None
+
+    response = client.get("/chat/my_chats/1", headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == 401
+
+
+def test_read_routes_use_reader_pool():
+    before = pool_metrics()
+    response = client.get("/auth/users/")
+    assert response.status_code == 200
+    after = pool_metrics()
+
+    assert after["reader"]["checkouts_total"] > before["reader"]["checkouts_total"]
+    assert after["writer"]["checkouts_total"] == before["writer"]["checkouts_total"]
+
+
+def test_user_routes_run_bounded_queries(run):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    user_id = client.post("/auth/register", json={"username": "countuser", "password": "testpassword"}).json()["id"]
+    # сообщения пользователя не должны добавлять запросов к маршрутам пользователей
+    run(seed_messages([Message(text=f"message {i}", chat_id=1, sender_id=user_id) for i in range(50)]))
+    event.listen(read_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        response = client.post("/auth/jwt/login", data={"username": "countuser", "password": "testpassword"})
+        assert response.status_code == 200
+        assert len(statements) == 1
+
+        statements.clear()
+        response = client.get("/auth/users/")
+        assert response.status_code == 200
+        assert len(statements) == 1
+        assert "messages" not in statements[0]
+    finally:
+        event.remove(read_engine.sync_engine, "before_cursor_execute", record)
+        client.delete("/auth/user/?username=countuser")
+        run(delete_messages(user_id))
+
+
+def test_search_users_by_prefix():
+    user_ids = []
+    for name in ("search_b", "search_a", "search_c", "other_search"):
+        response = client.post("/auth/register", json={"username": name, "password": "testpassword"})
+        assert response.status_code == 200
+        user_ids.append(response.json()["id"])
+
+    response = client.get("/auth/users/search?q=search_&limit=2")
+    assert response.status_code == 200
+    assert [user["username"] for user in response.json()] == ["search_a", "search_b"]
+
+    response = client.get("/auth/users/search?q=search_&limit=2&after=search_b")
+    assert [user["username"] for user in response.json()] == ["search_c"]
+
+    for user_id in user_ids:
+        client.delete(f"/auth/user/?uuid={user_id}")
+
+
+def test_metrics_and_server_timing():
+    response = client.get("/auth/users/search?q=nobody")
+    assert response.status_code == 200
+    assert 'sql;desc="1 statements' in response.headers["Server-Timing"]
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'db_statements_total{method="GET",route="/auth/users/search",status="200"}' in response.text
+    assert "db_pool_checkouts_total" in response.text
+
+    client.get("/chat/all_chats/1")
+    assert 'http_requests_total{method="GET",route="/chat/all_chats/{status}",status="200"}' in client.get("/metrics").text
+
+
+def test_server_timing_counts_fetched_rows(register):
+    user_id, headers = register("row_counter")
+    chat = client.post("/chat/create_chat", json={"name": "Counted", "status": 1, "users": [user_id]}).json()
+    client.post("/messages/send_batch", json=[{"text": f"row {i}", "chat_id": chat["id"]} for i in range(60)], headers=headers)
+
+    response = client.post(f"/messages/get_chat_messages?chat_id={chat['id']}&limit=50", headers=headers)
+    assert len(response.json()) == 50
+    # the page itself plus whatever the auth and membership lookups fetched
+    rows = int(response.headers["Server-Timing"].split("statements, ")[1].split(" rows")[0])
+    assert 50 <= rows <= 52
+
+    client.delete(f"/auth/user/?uuid={user_id}")
+
+
+def test_route_label_with_repeated_parameter_values():
+    route = SimpleNamespace(path="/{chat_id}/messages/{message_id}")
+    stats = RequestStats({"path": "/chat/7/messages/7", "route": route})
+    assert stats.route == "/chat/{chat_id}/messages/{message_id}"
+    assert RequestStats({"path": "/nowhere"}).route == "unmatched"
+
+
+def test_login_rate_limited():
+    for _ in range(10):
+        response = client.post("/auth/jwt/login", data={"username": "brute_forced", "password": "guess"})
+        assert response.status_code != 429
+
+    response = client.post("/auth/jwt/login", data={"username": "brute_forced", "password": "guess"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert 'rate_limited_total{limit="login"} 1' in client.get("/metrics").text
+
+
+def test_token_bucket_refills_and_expires(run):
+    backend = MemoryRateLimitBackend(maxsize=2)
+
+    def take(key, capacity, rate):
+        return run(backend.take(key, capacity, rate))
+
+    assert take("slow", 2, 1.0) == 0
+    assert take("slow", 2, 1.0) == 0
+    assert take("slow", 2, 1.0) > 0.5
+
+    assert take("fast", 1, 200.0) == 0
+    assert take("fast", 1, 200.0) > 0
+    time.sleep(0.01)
+    assert take("fast", 1, 200.0) == 0
+
+    take("other", 1, 1.0)
+    assert len(backend) <= 2